@@ -0,0 +1,86 @@
+from collections import namedtuple
+
+
+class ApiError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+# only — поля для QuerySet.only(), related — для select_related(),
+# get — функция, достающая значение из объекта.
+Field = namedtuple('Field', ('only', 'related', 'get'))
+
+
+def _attr(name):
+    return Field((name,), (), lambda obj: getattr(obj, name))
+
+
+POST_FIELDS = {
+    'id': _attr('id'),
+    'text': _attr('text'),
+    'pub_date': _attr('pub_date'),
+    'author': Field(
+        ('author', 'author__username'), ('author',),
+        lambda post: post.author.username,
+    ),
+    'group': Field(
+        ('group', 'group__slug'), ('group',),
+        lambda post: post.group.slug if post.group_id else None,
+    ),
+    'image': Field(
+        ('image',), (), lambda post: post.image.url if post.image else None
+    ),
+    'comments_count': _attr('comments_count'),
+}
+
+GROUP_FIELDS = {
+    'id': _attr('id'),
+    'title': _attr('title'),
+    'slug': _attr('slug'),
+    'description': _attr('description'),
+}
+
+COMMENT_FIELDS = {
+    'id': _attr('id'),
+    'author': Field(
+        ('author', 'author__username'), ('author',),
+        lambda comment: comment.author.username,
+    ),
+    'text': _attr('text'),
+    'created': _attr('created'),
+}
+
+
+def parse_fields(request, available):
+    """Поля из ?fields=a,b; без параметра — все поля."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise ApiError(
+            'Неизвестные поля: %s. Доступны: %s.'
+            % (', '.join(unknown), ', '.join(available))
+        )
+    return fields
+
+
+def restrict(queryset, fields, available, always=('id',)):
+    """Загружает только выбранные поля и нужные для них связи.
+
+    always — поля, без которых не работает пагинация (сортировка).
+    """
+    only, related = list(always), []
+    for name in fields:
+        only.extend(available[name].only)
+        related.extend(available[name].related)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*only)
+
+
+def serialize(obj, fields, available):
+    return {name: available[name].get(obj) for name in fields}
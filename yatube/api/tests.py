@@ -0,0 +1,138 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post, User
+
+POSTS_COUNT = 25
+PAGE_SIZE = 20
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for index in range(POSTS_COUNT):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text='Пост %d' % index
+            )
+        for index in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text='Комментарий %d' % index
+            )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_post_list_pagination(self):
+        """Список постов отдаётся страницами по курсору."""
+        url = reverse('api:post_list')
+        data = self.guest_client.get(url).json()
+        self.assertEqual(len(data['results']), PAGE_SIZE)
+        self.assertEqual(data['results'][0]['id'], self.post.id)
+        self.assertIsNone(data['previous'])
+        data = self.guest_client.get(data['next']).json()
+        self.assertEqual(len(data['results']), POSTS_COUNT - PAGE_SIZE)
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только выбранные поля."""
+        data = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'id,author'}
+        ).json()
+        self.assertEqual(
+            data['results'][0], {'id': self.post.id, 'author': 'author'}
+        )
+
+    def test_unknown_field(self):
+        """Неизвестное поле — ошибка 400 с описанием."""
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_post_detail_with_comments(self):
+        """Пост отдаётся вместе с комментариями."""
+        data = self.guest_client.get(
+            reverse('api:post_detail', args=(self.post.id,))
+        ).json()
+        self.assertEqual(data['group'], self.group.slug)
+        self.assertEqual(data['comments_count'], 3)
+        self.assertEqual(
+            [comment['text'] for comment in data['comments']],
+            ['Комментарий 2', 'Комментарий 1', 'Комментарий 0'],
+        )
+        self.assertIsNone(data['comments_next'])
+
+    def test_post_detail_comments_pagination(self):
+        """Комментарии поста отдаются страницами по курсору."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.user, text='Комментарий')
+            for _ in range(PAGE_SIZE + 1)
+        )
+        url = reverse('api:post_detail', args=(post.id,))
+        data = self.guest_client.get(url).json()
+        self.assertEqual(len(data['comments']), PAGE_SIZE)
+        with self.assertNumQueries(2):
+            data = self.guest_client.get(data['comments_next']).json()
+        self.assertEqual(len(data['comments']), 1)
+        self.assertEqual(data['id'], post.id)
+        self.assertIsNone(data['comments_next'])
+
+    def test_fixed_query_count(self):
+        """Число запросов не зависит от выбранных полей и данных."""
+        post_fields = ('', 'id', 'id,author,group')
+        urls = (
+            (reverse('api:post_list'), post_fields, 1),
+            (reverse('api:group_list'), ('', 'id', 'id,slug'), 1),
+            (
+                reverse('api:group_posts', args=(self.group.slug,)),
+                post_fields, 2,
+            ),
+            (
+                reverse('api:profile_posts', args=(self.author.username,)),
+                post_fields, 2,
+            ),
+            (
+                reverse('api:post_detail', args=(self.post.id,)),
+                ('', 'id,comments', 'author,group,comments'), 2,
+            ),
+        )
+        for url, field_sets, queries in urls:
+            for fields in field_sets:
+                with self.subTest(url=url, fields=fields):
+                    with self.assertNumQueries(queries):
+                        response = self.guest_client.get(
+                            url, {'fields': fields}
+                        )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_follow_feed(self):
+        """Лента подписок доступна только авторизованным."""
+        url = reverse('api:follow_feed')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        with self.assertQueryBudget('api:follow_feed'):
+            data = self.authorized_client.get(url).json()
+        self.assertEqual(len(data['results']), PAGE_SIZE)
+        self.assertEqual(data['results'][0]['author'], 'author')
+
+    def test_not_found_and_methods(self):
+        """404 и запрещённые методы не отдают HTML."""
+        response = self.guest_client.get(
+            reverse('api:group_posts', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        response = self.authorized_client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
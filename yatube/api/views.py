@@ -0,0 +1,133 @@
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from posts.models import Comment, Group, Post
+from posts.paginator import CursorPaginator
+from posts.timeline import TimelinePaginator
+
+from .fields import (
+    COMMENT_FIELDS, GROUP_FIELDS, POST_FIELDS, ApiError, parse_fields,
+    restrict, serialize,
+)
+
+User = get_user_model()
+
+PAGE_SIZE = 20
+POST_ORDERING = ('pub_date', 'id')
+COMMENT_ORDERING = ('-created', 'id')
+
+
+def api_view(view):
+    """GET/HEAD-only view, ошибки которой отдаются в JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return JsonResponse(view(request, *args, **kwargs))
+        except ApiError as error:
+            return JsonResponse(
+                {'detail': error.detail}, status=error.status
+            )
+        except Http404:
+            return JsonResponse({'detail': 'Не найдено.'}, status=404)
+    return wrapper
+
+
+def page_url(request, cursor, param='cursor'):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[param] = cursor
+    return request.build_absolute_uri('?' + query.urlencode())
+
+
+def paginate(request, paginator, fields, available):
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': [serialize(obj, fields, available) for obj in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    }
+
+
+def paginate_posts(request, queryset):
+    fields = parse_fields(request, POST_FIELDS)
+    queryset = restrict(queryset, fields, POST_FIELDS, POST_ORDERING)
+    return paginate(
+        request, CursorPaginator(queryset, PAGE_SIZE), fields, POST_FIELDS
+    )
+
+
+@api_view
+def post_list(request):
+    return paginate_posts(request, Post.objects.all())
+
+
+@api_view
+def group_list(request):
+    fields = parse_fields(request, GROUP_FIELDS)
+    queryset = restrict(
+        Group.objects.all(), fields, GROUP_FIELDS, ('title', 'id')
+    )
+    paginator = CursorPaginator(queryset, PAGE_SIZE, ordering=('title', 'id'))
+    return paginate(request, paginator, fields, GROUP_FIELDS)
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return paginate_posts(request, Post.objects.filter(group=group))
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return paginate_posts(request, Post.objects.filter(author=author))
+
+
+@api_view
+def post_detail(request, post_id):
+    """Пост со страницей комментариев: два запроса при любых полях.
+
+    Комментарии идут от новых к старым страницами по PAGE_SIZE, как на
+    post_detail сайта; следующая страница — ссылка comments_next с
+    курсором в параметре comments.
+    """
+    fields = parse_fields(request, dict(POST_FIELDS, comments=None))
+    post_fields = [name for name in fields if name != 'comments']
+    post = get_object_or_404(
+        restrict(Post.objects.all(), post_fields, POST_FIELDS), pk=post_id
+    )
+    data = serialize(post, post_fields, POST_FIELDS)
+    if 'comments' in fields:
+        comments = restrict(
+            Comment.objects.filter(post=post),
+            COMMENT_FIELDS, COMMENT_FIELDS, ('created', 'id'),
+        )
+        page = CursorPaginator(
+            comments, PAGE_SIZE, ordering=COMMENT_ORDERING
+        ).get_page(request.GET.get('comments'))
+        data['comments'] = [
+            serialize(comment, COMMENT_FIELDS, COMMENT_FIELDS)
+            for comment in page
+        ]
+        data['comments_next'] = page_url(
+            request, page.next_cursor, 'comments'
+        )
+    return data
+
+
+@api_view
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Требуется авторизация.', status=401)
+    fields = parse_fields(request, POST_FIELDS)
+    paginator = TimelinePaginator(request.user, PAGE_SIZE)
+    paginator.object_list = restrict(
+        Post.objects.all(), fields, POST_FIELDS, POST_ORDERING
+    )
+    return paginate(request, paginator, fields, POST_FIELDS)
@@ -0,0 +1,248 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import timing
+
+MAX_VARIABLES = 500
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_size ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' total INTEGER NOT NULL'
+    ')',
+    'INSERT OR IGNORE INTO cache_size (id, total) VALUES (0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_size_insert AFTER INSERT ON cache '
+    'BEGIN UPDATE cache_size SET total = total + new.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_size_delete AFTER DELETE ON cache '
+    'BEGIN UPDATE cache_size SET total = total - old.size; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_size_update AFTER UPDATE ON cache '
+    'BEGIN UPDATE cache_size SET total = total + new.size - old.size; END',
+)
+
+
+@contextmanager
+def _transaction(db):
+    with timing.measure('cache'):
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в WAL-файле SQLite, общий для всех процессов на хосте.
+
+    get/set/add/incr атомарны между процессами: запись идёт в
+    транзакции BEGIN IMMEDIATE. Объём значений ограничен MAX_BYTES,
+    при превышении вытесняются давно не читанные ключи (LRU). Время
+    доступа обновляется не чаще раза в ACCESS_RESOLUTION секунд,
+    чтобы чтения не превращались в записи.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self.access_resolution = float(options.get('ACCESS_RESOLUTION', 1))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            with _transaction(db):
+                for statement in SCHEMA:
+                    db.execute(statement)
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key, value, timeout, now):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return (key, data, self.get_backend_timeout(timeout), now, len(data))
+
+    def _write(self, db, rows):
+        db.executemany(
+            'INSERT OR REPLACE INTO cache'
+            ' (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+            rows,
+        )
+
+    def _evict(self, db, now):
+        total, = db.execute('SELECT total FROM cache_size').fetchone()
+        if total <= self.max_bytes:
+            return
+        db.execute(
+            'DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?',
+            (now,),
+        )
+        total, = db.execute('SELECT total FROM cache_size').fetchone()
+        victims = []
+        rows = db.execute('SELECT key, size FROM cache ORDER BY accessed')
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        db.executemany('DELETE FROM cache WHERE key = ?', victims)
+
+    def _fetch(self, db, keys, now):
+        rows = []
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            rows += db.execute(
+                'SELECT key, value, expires, accessed FROM cache'
+                ' WHERE key IN (%s)' % ', '.join('?' * len(chunk)),
+                chunk,
+            ).fetchall()
+        found, expired, touched = {}, [], []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                expired.append((key,))
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > self.access_resolution:
+                touched.append((now, key))
+        if expired or touched:
+            with _transaction(db):
+                db.executemany('DELETE FROM cache WHERE key = ?', expired)
+                db.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?', touched
+                )
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        with timing.measure('cache'):
+            found = self._fetch(self._db, [key], time.time())
+        self._count(1, len(found))
+        return found.get(key, default)
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        key_map = {self._key(key, version): key for key in keys}
+        with timing.measure('cache'):
+            found = self._fetch(self._db, list(key_map), time.time())
+        self._count(len(key_map), len(found))
+        return {key_map[key]: value for key, value in found.items()}
+
+    def _count(self, requested, found):
+        timing.count('cache_hit', found)
+        timing.count('cache_miss', requested - found)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ]
+        db = self._db
+        with _transaction(db):
+            self._write(db, rows)
+            self._evict(db, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        db = self._db
+        with _transaction(db):
+            row = db.execute(
+                'SELECT expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None and (row[0] is None or row[0] > now):
+                return False
+            self._write(db, [self._row(key, value, timeout, now)])
+            self._evict(db, now)
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        db = self._db
+        with _transaction(db):
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] is not None and row[1] <= now:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ?'
+                ' WHERE key = ?',
+                (data, len(data), now, key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with _transaction(db):
+            return bool(db.execute(
+                'UPDATE cache SET expires = ? WHERE key = ?'
+                ' AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._db.execute(
+            'SELECT 1 FROM cache WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        db = self._db
+        with _transaction(db):
+            db.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(self._key(key, version),) for key in keys],
+            )
+
+    def clear(self):
+        db = self._db
+        with _transaction(db):
+            db.execute('DELETE FROM cache')
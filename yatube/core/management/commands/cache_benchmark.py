@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = (
+    ('locmem', 'django.core.cache.backends.locmem.LocMemCache', None),
+    ('filebased', 'django.core.cache.backends.filebased.FileBasedCache',
+     'files'),
+    ('sqlite', 'core.cache.SQLiteCache', 'cache.sqlite3'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость SQLiteCache с LocMemCache и FileBasedCache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ops', type=int, default=5000)
+        parser.add_argument('--value-size', type=int, default=2048)
+        parser.add_argument('--keys', type=int, default=500)
+
+    def handle(self, *args, **options):
+        value = 'x' * options['value_size']
+        keys = ['bench:%d' % index for index in range(options['keys'])]
+        ops = options['ops']
+        self.stdout.write('%-10s %12s %12s %12s %12s' % (
+            'backend', 'set/s', 'get/s', 'get_many/s', 'incr/s'))
+        with tempfile.TemporaryDirectory() as directory:
+            for name, path, location in BACKENDS:
+                if location is not None:
+                    location = os.path.join(directory, location)
+                # Места хватает на все ключи: вытеснение не замеряется.
+                # LocMemCache и FileBasedCache ограничены числом ключей,
+                # SQLiteCache — объёмом значений.
+                cache = import_string(path)(location or name, {
+                    'OPTIONS': {
+                        'MAX_ENTRIES': len(keys) * 2,
+                        'MAX_BYTES': len(keys) * 2 * (len(value) + 1024),
+                    },
+                })
+                cache.set('bench:counter', 0)
+                results = (
+                    self.measure(ops, lambda i: cache.set(
+                        keys[i % len(keys)], value)),
+                    self.measure(ops, lambda i: cache.get(
+                        keys[i % len(keys)])),
+                    self.measure(ops // 10, lambda i: cache.get_many(
+                        keys[i % len(keys):i % len(keys) + 10])),
+                    self.measure(ops, lambda i: cache.incr('bench:counter')),
+                )
+                self.stdout.write('%-10s %12.0f %12.0f %12.0f %12.0f' % (
+                    (name,) + results))
+
+    def measure(self, ops, operation):
+        start = time.perf_counter()
+        for index in range(ops):
+            operation(index)
+        return ops / (time.perf_counter() - start)
@@ -0,0 +1,35 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replica import replicate
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в файл реплики для чтения лент. '
+        'С --interval повторяет копирование, пока не прервут.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help='Файл реплики.')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Период обновления в секундах; меньше REPLICA_PIN_SECONDS.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            try:
+                target = replicate(options['target'])
+            except ValueError as error:
+                raise CommandError(error)
+            self.stdout.write('%s: %.1f КБ за %.0f мс' % (
+                target, os.path.getsize(target) / 1024,
+                (time.perf_counter() - start) * 1000,
+            ))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
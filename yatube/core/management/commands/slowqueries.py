@@ -0,0 +1,50 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import read_entries, summarize
+
+SORT_KEYS = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка журнала медленных запросов: отпечатки SQL по суммарному '
+        'времени с именами URL и местами в коде и шаблонах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total'
+        )
+        parser.add_argument(
+            '--hours', type=float,
+            help='Только записи за последние столько часов.',
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options['hours'] is not None:
+            since = (
+                datetime.datetime.now(datetime.timezone.utc)
+                - datetime.timedelta(hours=options['hours'])
+            ).isoformat()
+        groups = summarize(read_entries(options['log'], since))
+        if not groups:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        key = SORT_KEYS[options['sort']]
+        groups.sort(key=lambda group: group[key], reverse=True)
+        for group in groups[:options['limit']]:
+            self.stdout.write('%6d × %9.1f мс всего, %8.1f мс макс.' % (
+                group['count'], group['total_ms'], group['max_ms']))
+            self.stdout.write('  ' + group['fingerprint'])
+            for title, counts in (('URL', group['url_names']),
+                                  ('откуда', group['origins'])):
+                top = sorted(counts.items(), key=lambda item: -item[1])[:3]
+                for name, count in top:
+                    self.stdout.write('  %-7s %5d  %s' % (title, count, name))
+            self.stdout.write('')
@@ -0,0 +1,287 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+PREFIX = 'yatube_'
+INITIAL_SIZE = 64 * 1024
+# Заголовок файла: занятый объём в байтах. Запись: длина ключа,
+# ключ, выравнивание до 8 байт и значение double.
+_USED = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+
+
+def _padded(length):
+    return length + (-length) % 8
+
+
+class MmapStore:
+    """Значения метрик одного процесса в файле, отображённом в память.
+
+    Писатель у файла один — процесс, чей pid в имени файла, поэтому
+    межпроцессные блокировки не нужны: /metrics читает файлы всех
+    процессов и складывает значения. Новая запись сначала пишется
+    целиком и лишь затем учитывается в заголовке, так что читатель
+    видит только законченные записи.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(INITIAL_SIZE)
+        self.memory = mmap.mmap(self.file.fileno(), 0)
+        self.used = _USED.unpack_from(self.memory, 0)[0] or _USED.size
+        self.positions = {
+            key: position for key, _, position in _entries(
+                self.memory, self.used
+            )
+        }
+
+    def inc(self, key, amount):
+        with self.lock:
+            position = self.positions.get(key)
+            if position is None:
+                position = self._append(key)
+            value = _VALUE.unpack_from(self.memory, position)[0]
+            _VALUE.pack_into(self.memory, position, value + amount)
+
+    def _append(self, key):
+        encoded = key.encode()
+        size = _padded(_LENGTH.size + len(encoded)) + _VALUE.size
+        while self.used + size > len(self.memory):
+            self.memory.resize(len(self.memory) * 2)
+        _LENGTH.pack_into(self.memory, self.used, len(encoded))
+        self.memory[
+            self.used + _LENGTH.size:self.used + _LENGTH.size + len(encoded)
+        ] = encoded
+        position = self.used + size - _VALUE.size
+        _VALUE.pack_into(self.memory, position, 0.0)
+        self.used += size
+        _USED.pack_into(self.memory, 0, self.used)
+        self.positions[key] = position
+        return position
+
+    def close(self):
+        self.memory.close()
+        self.file.close()
+
+
+def _entries(data, used):
+    position = _USED.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        start = position + _LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        value_position = position + _padded(_LENGTH.size + length)
+        value = _VALUE.unpack_from(data, value_position)[0]
+        yield key, value, value_position
+        position = value_position + _VALUE.size
+
+
+def read_file(path):
+    with open(path, 'rb') as stream:
+        data = stream.read()
+    if len(data) < _USED.size:
+        return
+    used = min(_USED.unpack_from(data, 0)[0], len(data))
+    for key, value, _ in _entries(data, used):
+        yield key, value
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Файл текущего процесса; после fork создаётся заново."""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        with _store_lock:
+            if _store_pid != pid:
+                os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                _store = MmapStore(os.path.join(
+                    settings.METRICS_DIR, 'metrics-%d.db' % pid
+                ))
+                _store_pid = pid
+    return _store
+
+
+def reset_store():
+    """Закрывает файл процесса, например при смене METRICS_DIR в тестах."""
+    global _store, _store_pid
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = _store_pid = None
+
+
+def collect():
+    """Сумма значений по файлам всех процессов: ключ -> значение."""
+    totals = defaultdict(float)
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+        for key, value in read_file(path):
+            totals[key] += value
+    return totals
+
+
+REGISTRY = []
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.keys = {}
+        REGISTRY.append(self)
+
+    def _key(self, part, labels, *extra):
+        """Ключ в файле; json.dumps на каждый inc обошёлся бы дорого."""
+        values = tuple(str(labels[name]) for name in self.labels)
+        cache_key = (part, values) + extra
+        key = self.keys.get(cache_key)
+        if key is None:
+            key = self.keys[cache_key] = json.dumps(
+                [self.name, part, list(values)] + list(extra),
+                ensure_ascii=False,
+            )
+        return key
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if settings.METRICS_ENABLED and amount:
+            get_store().inc(self._key('total', labels), amount)
+
+    def samples(self, values):
+        for (part, label_values), value in sorted(values.items()):
+            yield '_total', self.labels, label_values, value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=()):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        store = get_store()
+        index = bisect_left(self.buckets, value)
+        bound = self.buckets[index] if index < len(self.buckets) else None
+        store.inc(self._key('bucket', labels, bound), 1)
+        store.inc(self._key('sum', labels), value)
+        store.inc(self._key('count', labels), 1)
+
+    def samples(self, values):
+        series = defaultdict(dict)
+        for (part, label_values, *bound), value in values.items():
+            series[label_values][(part,) + tuple(bound)] = value
+        for label_values, parts in sorted(series.items()):
+            cumulative = 0
+            for bound in self.buckets + (None,):
+                cumulative += parts.get(('bucket', bound), 0)
+                yield '_bucket', self.labels + ('le',), label_values + (
+                    '+Inf' if bound is None else _number(bound),
+                ), cumulative
+            yield '_sum', self.labels, label_values, parts.get(('sum',), 0)
+            yield '_count', self.labels, label_values, parts.get(
+                ('count',), 0
+            )
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace(
+        '"', r'\"'
+    )
+
+
+def render():
+    """Текстовый формат Prometheus 0.0.4 по всем процессам."""
+    grouped = defaultdict(dict)
+    for key, value in collect().items():
+        name, part, label_values, *extra = json.loads(key)
+        grouped[name][(part, tuple(label_values)) + tuple(extra)] = value
+    lines = []
+    for metric in REGISTRY:
+        lines.append('# HELP %s %s' % (metric.name, metric.documentation))
+        lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+        for suffix, names, label_values, value in metric.samples(
+            grouped.get(metric.name, {})
+        ):
+            labels = ','.join(
+                '%s="%s"' % (name, _escape(label))
+                for name, label in zip(names, label_values)
+            )
+            lines.append('%s%s%s %s' % (
+                metric.name, suffix, '{%s}' % labels if labels else '',
+                _number(value),
+            ))
+    return '\n'.join(lines) + '\n'
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = tuple(1024 * 2 ** power for power in range(0, 15, 2))
+
+REQUESTS = Counter(
+    'http_requests', 'Запросы по имени URL, методу и статусу.',
+    ('view', 'method', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Время ответа по имени URL.',
+    ('view',), LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'Запросов к БД на один запрос.',
+    ('view',), QUERY_BUCKETS,
+)
+DB_SECONDS = Counter(
+    'db_query_seconds', 'Время запросов к БД по имени URL.', ('view',),
+)
+CACHE_LOOKUPS = Counter(
+    'cache_lookups',
+    'Чтения ключей кэша; доля попаданий — hit / (hit + miss).',
+    ('result',),
+)
+PAGE_CACHE_LOOKUPS = Counter(
+    'page_cache_lookups', 'Обращения к cache_page по имени URL.',
+    ('view', 'result'),
+)
+THUMBNAILS_GENERATED = Counter(
+    'thumbnails_generated', 'Созданные миниатюры sorl-thumbnail.',
+)
+THUMBNAIL_KV_LOOKUPS = Counter(
+    'thumbnail_kv_lookups',
+    'Чтения KV-хранилища миниатюр: tier lru — память процесса, '
+    'store — общий кэш и БД после промаха LRU.',
+    ('tier', 'result'),
+)
+POST_IMAGE_BYTES = Histogram(
+    'post_image_bytes',
+    'Размер изображений постов: загруженного и сохранённого файла.',
+    ('stage',), SIZE_BUCKETS,
+)
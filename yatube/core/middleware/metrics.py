@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import metrics, timing
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class MetricsMiddleware:
+    """Метрики запросов для /metrics: число, время, запросы к БД, кэш.
+
+    Фазы запроса берутся из замера core.timing, общего с
+    ServerTimingMiddleware, поэтому стоит в MIDDLEWARE раньше неё.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timing.request_timer(request) as timer:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        method = request.method if request.method in METHODS else 'other'
+        counts = timer.counts
+        metrics.REQUESTS.inc(
+            view=view, method=method, status=response.status_code
+        )
+        metrics.REQUEST_DURATION.observe(timer.total, view=view)
+        metrics.DB_QUERIES.observe(counts['db'], view=view)
+        metrics.DB_SECONDS.inc(timer.durations['db'], view=view)
+        metrics.CACHE_LOOKUPS.inc(counts['cache_hit'], result='hit')
+        metrics.CACHE_LOOKUPS.inc(counts['cache_miss'], result='miss')
+        if counts['page_hit'] or counts['page_miss']:
+            metrics.PAGE_CACHE_LOOKUPS.inc(
+                view=view, result='hit' if counts['page_hit'] else 'miss'
+            )
+        return response
@@ -0,0 +1,51 @@
+import logging
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import profiling
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """Профилирует cProfile долю PROFILING_SAMPLE_RATE запросов.
+
+    Запрос с подписанным токеном в заголовке PROFILING_HEADER
+    профилируется всегда; токен выдаёт страница admin/profiles/.
+    Замеры пишутся в PROFILING_DIR по каталогу на view, одновременно
+    профилируется не больше одного запроса на процесс.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PROFILING_HEADER.upper().replace(
+            '-', '_'
+        )
+
+    def should_profile(self, request):
+        token = request.META.get(self.header)
+        if token is not None:
+            return profiling.check_token(token)
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        with profiling.Sample() as sample:
+            response = self.get_response(request)
+        if sample.profiler is None:
+            return response
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        try:
+            response['X-Profile-Id'] = '%s/%s' % (
+                view_name, profiling.save(sample, view_name)
+            )
+        except OSError:
+            logger.exception('Не удалось сохранить профиль %s', request.path)
+        return response
@@ -0,0 +1,32 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core.queries import check_budget, record_queries
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Сообщает о view, превысивших бюджет запросов к БД.
+
+    Работает только в DEBUG и при включённой QUERY_BUDGET_ENABLED;
+    в тестах те же проверки выполняет core.testing.QueryBudgetMixin.
+    """
+
+    def __init__(self, get_response):
+        if not (settings.DEBUG and settings.QUERY_BUDGET_ENABLED):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view_name = match.view_name if match else request.path
+        response['X-Query-Count'] = recorder.count
+        response['X-Query-Time'] = '%.1fms' % (recorder.duration * 1000)
+        for violation in check_budget(view_name, recorder):
+            logger.warning(violation)
+        return response
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import replica
+
+
+class ReplicaMiddleware:
+    """Направляет чтение view из REPLICA_VIEWS на реплику.
+
+    Клиент, только что записавший посты, комментарии или подписки,
+    получает cookie REPLICA_PIN_COOKIE и REPLICA_PIN_SECONDS секунд
+    читает из default, пока реплика не догонит основную базу.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with replica.request_state() as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replica.current().alias = replica.read_alias(request)
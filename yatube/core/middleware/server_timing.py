@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from core import timing
+
+
+class ServerTimingMiddleware:
+    """Заголовок Server-Timing с временем БД, шаблонов, кэша и миниатюр.
+
+    Добавляется к ответам view приложений из SERVER_TIMING_APPS.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.apps = set(settings.SERVER_TIMING_APPS)
+
+    def __call__(self, request):
+        with timing.request_timer(request) as timer:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None and match.app_name in self.apps:
+            response['Server-Timing'] = timer.header()
+        return response
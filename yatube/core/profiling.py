@@ -0,0 +1,224 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiling'
+PROFILE_SUFFIX = '.prof'
+FOLDED_SUFFIX = '.folded'
+
+# cProfile ставит профилировщик на поток, но замеры нескольких
+# параллельных запросов мешают друг другу, поэтому профилируем по одному.
+_lock = threading.Lock()
+
+
+def make_token():
+    return signing.TimestampSigner(salt=SALT).sign(uuid.uuid4().hex)
+
+
+def check_token(token):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class Sample:
+    """Профилирование одного запроса; пустой, если другой уже идёт.
+
+    Кроме cProfile, отдельный поток раз в PROFILING_STACK_INTERVAL
+    секунд снимает стек профилируемого потока. cProfile хранит только
+    рёбра «вызывающий -> вызываемый», и по ним не восстановить стеки
+    там, где одна функция встречается на разной глубине (обёртки
+    middleware Django), а снятые стеки дают точный flame graph.
+    """
+
+    def __init__(self):
+        self.profiler = None
+        self.stacks = Counter()
+
+    def __enter__(self):
+        if not _lock.acquire(blocking=False):
+            return self
+        self.thread_id = threading.get_ident()
+        self.base = sys._getframe(1)
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+        self.sampler.start()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        self.stopped.set()
+        self.sampler.join()
+        del self.base
+        _lock.release()
+
+    def _sample(self):
+        interval = settings.PROFILING_STACK_INTERVAL
+        last = time.perf_counter()
+        while not self.stopped.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(label(
+                    (code.co_filename, code.co_firstlineno, code.co_name)
+                ))
+                if frame is self.base:
+                    break
+                frame = frame.f_back
+            else:
+                # Поток уже вышел из профилируемого блока.
+                continue
+            self.stacks[';'.join(reversed(stack))] += int(elapsed * 1e6)
+
+
+def view_directory(view_name):
+    return os.path.join(
+        settings.PROFILING_DIR, view_name.replace(':', '.').replace('/', '_')
+    )
+
+
+@lru_cache(maxsize=10000)
+def label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    for path in sorted(sys.path + [settings.BASE_DIR], key=len, reverse=True):
+        if path and filename.startswith(path + os.sep):
+            filename = filename[len(path) + 1:]
+            break
+    return '%s:%d(%s)' % (filename, line, name)
+
+
+def save(sample, view_name):
+    """Пишет .prof и .folded в каталог view и удаляет лишние старые.
+
+    В .folded строки «a;b;c микросекунды» — формат flamegraph.pl.
+    """
+    directory = view_directory(view_name)
+    os.makedirs(directory, exist_ok=True)
+    name = '%d-%d-%s' % (
+        time.time() * 1000, os.getpid(), uuid.uuid4().hex[:6]
+    )
+    base = os.path.join(directory, name)
+    sample.profiler.dump_stats(base + PROFILE_SUFFIX)
+    with open(base + FOLDED_SUFFIX, 'w', encoding='utf-8') as stream:
+        for stack, microseconds in sample.stacks.most_common():
+            stream.write('%s %d\n' % (stack, microseconds))
+    _trim(directory)
+    return name
+
+
+def _samples(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        name[:-len(FOLDED_SUFFIX)] for name in names
+        if name.endswith(FOLDED_SUFFIX)
+    )
+
+
+def _trim(directory):
+    samples = _samples(directory)
+    for name in samples[:-settings.PROFILING_MAX_SAMPLES]:
+        for suffix in (PROFILE_SUFFIX, FOLDED_SUFFIX):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def profiled_views():
+    """{имя view: число сохранённых замеров}."""
+    try:
+        names = sorted(os.listdir(settings.PROFILING_DIR))
+    except FileNotFoundError:
+        return {}
+    return {
+        name: len(_samples(os.path.join(settings.PROFILING_DIR, name)))
+        for name in names
+    }
+
+
+def merged_stacks(view_name):
+    """Сумма свёрнутых стеков всех замеров view."""
+    directory = view_directory(view_name)
+    stacks = Counter()
+    for name in _samples(directory):
+        path = os.path.join(directory, name + FOLDED_SUFFIX)
+        with open(path, encoding='utf-8') as stream:
+            for line in stream:
+                stack, _, microseconds = line.rstrip('\n').rpartition(' ')
+                stacks[stack] += int(microseconds)
+    return stacks
+
+
+def merged_stats(view_name):
+    """pstats.Stats по всем .prof view или None."""
+    directory = view_directory(view_name)
+    paths = [
+        os.path.join(directory, name + PROFILE_SUFFIX)
+        for name in _samples(directory)
+    ]
+    paths = [path for path in paths if os.path.exists(path)]
+    return pstats.Stats(*paths) if paths else None
+
+
+def flame_tree(stacks):
+    """Дерево {name, value, children} для d3-flame-graph и speedscope."""
+    root = {'name': 'all', 'value': 0, 'children': {}}
+    for stack, microseconds in stacks.items():
+        node = root
+        node['value'] += microseconds
+        for frame in stack.split(';'):
+            node = node['children'].setdefault(
+                frame, {'name': frame, 'value': 0, 'children': {}}
+            )
+            node['value'] += microseconds
+
+    def listed(node):
+        return dict(node, children=sorted(
+            (listed(child) for child in node['children'].values()),
+            key=lambda child: -child['value'],
+        ))
+
+    return listed(root)
+
+
+def flame_rows(tree, min_share=0.005):
+    """Прямоугольники flame graph: (глубина, отступ %, ширина %, узел)."""
+    total = tree['value'] or 1
+    rows = []
+
+    def place(node, depth, offset):
+        width = node['value'] / total
+        if width < min_share:
+            return
+        rows.append((depth, offset * 100, width * 100, node))
+        for child in node['children']:
+            place(child, depth + 1, offset)
+            offset += child['value'] / total
+
+    place(tree, 0, 0)
+    return rows
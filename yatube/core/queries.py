@@ -0,0 +1,68 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """Приводит SQL к виду, одинаковому для запросов одной формы."""
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return LITERAL_RE.sub('?', sql)
+
+
+class QueryRecorder:
+    """Execute wrapper, считающий запросы, их время и отпечатки."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {
+            sql: count
+            for sql, count in self.fingerprints.items() if count > 1
+        }
+
+
+@contextmanager
+def record_queries(recorder=None):
+    recorder = recorder or QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def check_budget(view_name, recorder):
+    """Возвращает список нарушений бюджета запросов для view."""
+    violations = []
+    budget = settings.QUERY_BUDGETS.get(view_name)
+    if budget is not None and recorder.count > budget:
+        violations.append(
+            '%s: %d queries, budget is %d'
+            % (view_name, recorder.count, budget)
+        )
+    for sql, count in recorder.duplicates.items():
+        if count > settings.QUERY_REPEAT_LIMIT:
+            violations.append(
+                '%s: query repeated %d times (N+1?): %s'
+                % (view_name, count, sql)
+            )
+    return violations
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+_current = ContextVar('core.replica', default=None)
+
+
+class RequestState:
+    """База для чтения в текущем запросе и была ли запись."""
+
+    __slots__ = ('alias', 'wrote')
+
+    def __init__(self, alias=None):
+        self.alias = alias
+        self.wrote = False
+
+
+@contextmanager
+def request_state(alias=None):
+    token = _current.set(RequestState(alias))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def _replicated(model):
+    return model._meta.app_label in settings.REPLICA_APPS
+
+
+class ReplicaRouter:
+    """Чтение моделей REPLICA_APPS в выбранных запросах — с реплики.
+
+    Реплику выбирает core.middleware.replica.ReplicaMiddleware; вне
+    запроса и в остальных запросах всё читается из default. Запись
+    всегда идёт в default и отмечается в состоянии запроса, чтобы
+    закрепить клиента за default.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is not None and state.alias and _replicated(model):
+            return state.alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None and _replicated(model):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия той же базы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему реплика получает вместе с данными от manage.py replicate.
+        if db == settings.REPLICA_DATABASE:
+            return False
+        return None
+
+
+def _sync_key(path):
+    return 'replica:generation:%s' % os.path.abspath(path)
+
+
+def _generation():
+    return import_string(settings.REPLICA_GENERATION)()
+
+
+def replica_alias():
+    """Алиас реплики или None, если читать с неё нельзя.
+
+    None — реплика не настроена, указывает на ту же базу (TEST MIRROR
+    в тестах), ещё ни разу не копировалась или отстала: поколение
+    REPLICA_GENERATION изменилось после копирования. Страницы и
+    фрагменты с новыми версиями в ключах кэша иначе собирались бы из
+    старых строк и жили бы в кэше до следующей правки.
+    """
+    alias = settings.REPLICA_DATABASE
+    if alias not in settings.DATABASES:
+        return None
+    name = connections[alias].settings_dict['NAME']
+    if name == connections[DEFAULT_DB_ALIAS].settings_dict['NAME']:
+        return None
+    if not os.path.exists(name):
+        return None
+    synced = cache.get(_sync_key(name))
+    return alias if synced is not None and synced == _generation() else None
+
+
+def read_alias(request):
+    """Реплика для безопасных запросов без cookie недавней записи."""
+    match = request.resolver_match
+    if (
+        request.method not in SAFE_METHODS
+        or match is None
+        or match.view_name not in settings.REPLICA_VIEWS
+        or settings.REPLICA_PIN_COOKIE in request.COOKIES
+    ):
+        return None
+    return replica_alias()
+
+
+def replicate(target=None, source=DEFAULT_DB_ALIAS):
+    """Копирует SQLite-базу source в файл реплики, возвращает его путь.
+
+    Копия делается backup API SQLite во временный файл рядом с
+    репликой и подменяет её через os.replace: открытые соединения
+    дочитывают старую копию, новые открывают новую целиком. Поколение
+    REPLICA_GENERATION снимается до копирования и запоминается для
+    replica_alias: правка во время копирования тоже сочтёт реплику
+    отставшей.
+    """
+    connection = connections[source]
+    if connection.vendor != 'sqlite':
+        raise ValueError('Реплика поддерживается только для SQLite.')
+    if target is None:
+        target = connections[settings.REPLICA_DATABASE].settings_dict['NAME']
+    connection.ensure_connection()
+    generation = _generation()
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(target)), suffix='.tmp'
+    )
+    os.close(descriptor)
+    try:
+        destination = sqlite3.connect(temporary)
+        try:
+            connection.connection.backup(destination)
+        finally:
+            destination.close()
+        os.replace(temporary, target)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    cache.set(_sync_key(target), generation, None)
+    return target
@@ -0,0 +1,158 @@
+import datetime
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from core import timing
+from core.queries import fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Эти параметры безопасно писать в журнал как есть; строки, даты и
+# двоичные данные могут содержать персональные данные.
+PLAIN_TYPES = (bool, int, float, type(None))
+# Кадры обёрток, которые не считаются источником запроса.
+SKIPPED_FILES = ('core/slow_queries.py', 'core/timing.py', 'core/queries.py')
+TEMPLATE_RENDER = 'render_annotated'
+
+
+def redact(params, many):
+    if params is None:
+        return None
+    if many:
+        return '<%d rows>' % len(params)
+    if isinstance(params, dict):
+        return {name: _redact(value) for name, value in params.items()}
+    return [_redact(value) for value in params]
+
+
+def _redact(value):
+    if isinstance(value, PLAIN_TYPES):
+        return value
+    return '<%s>' % type(value).__name__
+
+
+def _project_file(filename):
+    base = settings.BASE_DIR + os.sep
+    if not filename.startswith(base) or 'site-packages' in filename:
+        return None
+    relative = filename[len(base):]
+    return None if relative.endswith(SKIPPED_FILES) else relative
+
+
+def origin(frame):
+    """Кадр проекта и узел шаблона, из-за которых выполнен запрос.
+
+    Узел шаблона — ближайший Node.render_annotated в стеке: так
+    находятся ленивые {{ post.group }} и {{ author.posts.count }}.
+    """
+    python = template = None
+    while frame is not None and (python is None or template is None):
+        code = frame.f_code
+        if template is None and code.co_name == TEMPLATE_RENDER:
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            node_origin = getattr(node, 'origin', None)
+            if token is not None and node_origin is not None:
+                template = '%s:%s %s' % (
+                    node_origin.template_name, token.lineno,
+                    token.contents[:200],
+                )
+        if python is None:
+            filename = _project_file(code.co_filename)
+            if filename is not None:
+                python = '%s:%d in %s' % (
+                    filename, frame.f_lineno, code.co_name
+                )
+        frame = frame.f_back
+    return python, template
+
+
+def _execute(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        threshold = settings.SLOW_QUERY_THRESHOLD
+        if threshold is not None and duration >= threshold:
+            log(sql, params, many, duration, context['connection'].alias)
+
+
+def log(sql, params, many, duration, alias):
+    python, template = origin(sys._getframe(2))
+    timer = timing.current()
+    request = timer.request if timer is not None else None
+    match = request.resolver_match if request is not None else None
+    logger.warning('slow query', extra={'query': {
+        'time': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'duration_ms': round(duration * 1000, 3),
+        'database': alias,
+        'fingerprint': fingerprint(sql),
+        'sql': sql,
+        'params': redact(params, many),
+        'url_name': match.view_name if match is not None else None,
+        'path': request.path if request is not None else None,
+        'python': python,
+        'template': template,
+    }})
+
+
+def install(connection, **kwargs):
+    """Обработчик connection_created: обёртка ставится один раз."""
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute)
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна запись журнала — одна строка JSON."""
+
+    def format(self, record):
+        return json.dumps(
+            getattr(record, 'query', {'message': record.getMessage()}),
+            ensure_ascii=False, default=str,
+        )
+
+
+def read_entries(path, since=None):
+    """Записи журнала и его ротированных копий, с since и новее."""
+    for name in sorted(glob.glob(glob.escape(path) + '*'), reverse=True):
+        with open(name, encoding='utf-8') as stream:
+            for line in stream:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or entry.get('time', '') >= since:
+                    yield entry
+
+
+def summarize(entries):
+    """Сводка по отпечаткам SQL, от наибольшего суммарного времени."""
+    groups = defaultdict(lambda: {
+        'count': 0,
+        'total_ms': 0.0,
+        'max_ms': 0.0,
+        'url_names': defaultdict(int),
+        'origins': defaultdict(int),
+    })
+    for entry in entries:
+        group = groups[entry['fingerprint']]
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['url_names'][entry.get('url_name') or '-'] += 1
+        group['origins'][
+            entry.get('template') or entry.get('python') or '-'
+        ] += 1
+    return sorted(
+        (dict(group, fingerprint=sql) for sql, group in groups.items()),
+        key=lambda group: group['total_ms'],
+        reverse=True,
+    )
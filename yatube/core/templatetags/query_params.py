@@ -0,0 +1,18 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def replace_params(context, **params):
+    """Текущая строка запроса с заменёнными параметрами.
+
+    Параметр со значением None удаляется из строки.
+    """
+    query = context['request'].GET.copy()
+    for name, value in params.items():
+        if value is None:
+            query.pop(name, None)
+        else:
+            query[name] = value
+    return query.urlencode()
@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from core.queries import check_budget, record_queries
+
+
+class QueryBudgetMixin:
+    """Проверки бюджета запросов для TestCase."""
+
+    @contextmanager
+    def assertQueryBudget(self, view_name):
+        with record_queries() as recorder:
+            yield recorder
+        violations = check_budget(view_name, recorder)
+        if violations:
+            self.fail('\n'.join(violations))
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты пишут файлы во временный каталог, а не в дерево проекта.
+
+    Загрузки и миниатюры, метрики и замеры профилировщика иначе
+    оставались бы в BASE_DIR после каждого прогона, а cache.clear() в
+    тестах очищал бы файл кэша запущенного рядом runserver.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.directory = tempfile.mkdtemp(prefix='yatube-tests-')
+        self.files = override_settings(
+            CACHES={
+                alias: dict(params, LOCATION=self.path('%s.cache' % alias))
+                for alias, params in settings.CACHES.items()
+            },
+            MEDIA_ROOT=self.path('media'),
+            METRICS_DIR=self.path('metrics'),
+            PROFILING_DIR=self.path('profiles'),
+            # Медленные запросы в тестах проверяются через assertLogs.
+            SLOW_QUERY_THRESHOLD=None,
+        )
+        self.files.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.files.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
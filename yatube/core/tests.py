@@ -0,0 +1,525 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.template.loader import render_to_string
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+
+from core import metrics, profiling, replica, slow_queries, timing
+from core.cache import SQLiteCache
+from core.thumbnails import LRUCache
+from posts.cache import bump_generation
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+INCREMENTS = 50
+WORKERS = 4
+
+
+def increment_counter(path):
+    cache = SQLiteCache(path, {})
+    for _ in range(INCREMENTS):
+        cache.incr('counter')
+
+
+def count_thumbnails():
+    for _ in range(INCREMENTS):
+        metrics.THUMBNAILS_GENERATED.inc()
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertEqual(
+            self.cache.get_many(['key', 'missing']), {'key': {'value': 1}}
+        )
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_add_and_incr(self):
+        """add не перезаписывает ключ, incr требует существующий ключ."""
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.incr('key', 5), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_timeout(self):
+        """Просроченные значения не возвращаются."""
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_lru_eviction_by_size(self):
+        """При превышении MAX_BYTES вытесняются давно не читанные ключи."""
+        cache = SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_BYTES': 5000, 'ACCESS_RESOLUTION': 0},
+        })
+        cache.set('old', 'x' * 2000)
+        cache.set('recent', 'x' * 2000)
+        cache.get('old')
+        cache.set('new', 'x' * 2000)
+        self.assertIsNotNone(cache.get('old'))
+        self.assertIsNone(cache.get('recent'))
+        self.assertIsNotNone(cache.get('new'))
+
+    def test_shared_between_processes(self):
+        """incr атомарен между процессами, работающими с одним файлом."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment_counter, args=(self.path,))
+            for _ in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), INCREMENTS * WORKERS)
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        """При переполнении удаляется давно не читанный ключ."""
+        lru = LRUCache(2, 60)
+        lru.set('old', 1)
+        lru.set('recent', 2)
+        lru.get('old')
+        lru.set('new', 3)
+        self.assertEqual(lru.get('old'), 1)
+        self.assertIsNone(lru.get('recent'))
+        self.assertEqual(lru.get('new'), 3)
+        self.assertEqual(len(lru), 2)
+
+    def test_timeout(self):
+        """Просроченные записи не возвращаются."""
+        lru = LRUCache(2, 0.01)
+        lru.set('key', 'value')
+        time.sleep(0.02)
+        self.assertIsNone(lru.get('key'))
+        self.assertEqual(len(lru), 0)
+
+
+def _leaf():
+    return sum(range(1000))
+
+
+def _branch():
+    return _leaf() + _leaf()
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            PROFILING_DIR=self.directory
+        )
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_stack_sampling(self):
+        """Снятые стеки повторяют цепочку вызовов."""
+        with profiling.Sample() as sample:
+            deadline = time.monotonic() + 0.1
+            while time.monotonic() < deadline:
+                _branch()
+        self.assertTrue(any(
+            '(test_stack_sampling);' in stack and '(_branch);' in stack
+            and '(_leaf)' in stack
+            for stack in sample.stacks
+        ))
+        self.assertIn('_leaf', str(sample.profiler.getstats()))
+
+    def test_one_sample_at_a_time(self):
+        """Вложенный замер пропускается, пока идёт другой."""
+        with profiling.Sample() as outer:
+            with profiling.Sample() as inner:
+                pass
+        self.assertIsNotNone(outer.profiler)
+        self.assertIsNone(inner.profiler)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_is_saved(self):
+        """Профиль запроса сохраняется в каталог его view."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response['X-Profile-Id'].startswith('posts:index/'))
+        self.assertEqual(profiling.profiled_views(), {'posts.index': 1})
+        self.assertIsNotNone(profiling.merged_stats('posts.index'))
+
+    def test_signed_header(self):
+        """Запрос профилируется только с верно подписанным токеном."""
+        response = self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE='forged'
+        )
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        response = self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE=profiling.make_token()
+        )
+        self.assertTrue(response.has_header('X-Profile-Id'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_MAX_SAMPLES=2)
+    def test_old_samples_are_trimmed(self):
+        """В каталоге view остаётся не больше PROFILING_MAX_SAMPLES."""
+        for _ in range(4):
+            self.client.get(reverse('about:author'))
+        self.assertEqual(profiling.profiled_views(), {'about.author': 2})
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_admin_page(self):
+        """Страница профилей доступна только персоналу."""
+        self.client.get(reverse('about:author'))
+        url = reverse('admin_profiles')
+        self.client.force_login(User.objects.create_user('reader'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(
+            User.objects.create_user('staff', is_staff=True)
+        )
+        with override_settings(PROFILING_SAMPLE_RATE=0):
+            response = self.client.get(url, {'view': 'about.author'})
+            folded = self.client.get(
+                url, {'view': 'about.author', 'format': 'folded'}
+            )
+            tree = self.client.get(
+                url, {'view': 'about.author', 'format': 'json'}
+            ).json()
+        self.assertContains(response, 'about.author')
+        self.assertTrue(response.context['functions'])
+        lines = folded.content.decode().splitlines()
+        self.assertEqual(
+            sum(int(line.rpartition(' ')[2]) for line in lines),
+            tree['value'],
+        )
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_nested_phases_are_counted_once(self):
+        """Вложенный замер той же фазы не удваивает время."""
+        timer = timing.Timer()
+        with timing.activate(timer):
+            with timing.measure('cache'):
+                with timing.measure('cache'):
+                    time.sleep(0.01)
+        self.assertEqual(timer.counts['cache'], 1)
+        self.assertLess(timer.durations['cache'], 0.02)
+
+    def test_no_timer_outside_request(self):
+        """Вне запроса замеры ничего не делают."""
+        with timing.measure('cache'):
+            timing.count('cache_hit')
+        self.assertIsNone(timing.current())
+
+    def test_header(self):
+        """Заголовок содержит БД, шаблоны, кэш и итоговое время."""
+        response = self.client.get(reverse('posts:search'), {'q': 'текст'})
+        header = response['Server-Timing']
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="DB, \d+ queries"')
+        self.assertIn('template;dur=', header)
+        self.assertRegex(header, r'total;dur=[\d.]+$')
+
+    def test_index_page_cache(self):
+        """Попадание в cache_page index видно в заголовке."""
+        first = self.client.get(reverse('posts:index'))['Server-Timing']
+        second = self.client.get(reverse('posts:index'))['Server-Timing']
+        self.assertIn('page;desc="miss"', first)
+        self.assertIn('page;desc="hit"', second)
+        self.assertRegex(second, r'cache;dur=[\d.]+;desc="Cache, [1-9]')
+        self.assertNotIn('template;', second)
+
+    def test_only_configured_apps(self):
+        """Ответы API заголовок не получают."""
+        response = self.client.get(reverse('about:author'))
+        self.assertTrue(response.has_header('Server-Timing'))
+        response = self.client.get(reverse('api:post_list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            METRICS_DIR=self.directory
+        )
+        self.settings_override.enable()
+        metrics.reset_store()
+
+    def tearDown(self):
+        metrics.reset_store()
+        self.settings_override.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_request_metrics(self):
+        """Запросы считаются по имени URL, статусу и времени ответа."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.client.get('/missing/')
+        text = metrics.render()
+        self.assertIn(
+            'yatube_http_requests_total{view="posts:index",method="GET",'
+            'status="200"} 2', text
+        )
+        self.assertIn(
+            'yatube_http_requests_total{view="unresolved",method="GET",'
+            'status="404"} 1', text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_count'
+            '{view="posts:index"} 2', text
+        )
+        self.assertIn(
+            'yatube_page_cache_lookups_total{view="posts:index",'
+            'result="hit"} 1', text
+        )
+        self.assertIn('yatube_cache_lookups_total{result="hit"}', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Корзины гистограммы накопительные, сумма — сумма значений."""
+        metrics.POST_IMAGE_BYTES.observe(100, stage='uploaded')
+        metrics.POST_IMAGE_BYTES.observe(5000, stage='uploaded')
+        text = metrics.render()
+        prefix = 'yatube_post_image_bytes'
+        self.assertIn(prefix + '_bucket{stage="uploaded",le="1024"} 1', text)
+        self.assertIn(prefix + '_bucket{stage="uploaded",le="16384"} 2', text)
+        self.assertIn(prefix + '_sum{stage="uploaded"} 5100', text)
+
+    def test_store_survives_reopen(self):
+        """Значения и позиции записей читаются из файла при открытии."""
+        metrics.THUMBNAILS_GENERATED.inc(2)
+        metrics.reset_store()
+        metrics.THUMBNAILS_GENERATED.inc()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        self.assertIn(
+            'yatube_thumbnails_generated_total 3', metrics.render()
+        )
+
+    def test_aggregated_across_processes(self):
+        """Счётчики всех процессов складываются."""
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=count_thumbnails)
+            for _ in range(WORKERS)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(len(os.listdir(self.directory)), WORKERS)
+        self.assertIn(
+            'yatube_thumbnails_generated_total %d' % (INCREMENTS * WORKERS),
+            metrics.render(),
+        )
+
+    def test_endpoint_closed_by_default(self):
+        """Без токена и адресов /metrics закрыт даже для loopback."""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=('127.0.0.1',))
+    def test_endpoint_allowed_ips(self):
+        """/metrics отвечает адресам из METRICS_ALLOWED_IPS."""
+        url = reverse('metrics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            '# TYPE yatube_http_requests counter', response.content.decode()
+        )
+        response = self.client.get(url, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint_bearer_token(self):
+        """/metrics отвечает запросу с токеном METRICS_TOKEN."""
+        url = reverse('metrics')
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+
+class SlowQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    @contextmanager
+    def slow_queries(self):
+        """Все запросы внутри блока считаются медленными."""
+        with self.settings(SLOW_QUERY_THRESHOLD=0):
+            with self.assertLogs('core.slow_queries') as logs:
+                yield logs
+
+    def test_view_and_python_origin(self):
+        """Запрос view помечен именем URL и строкой кода проекта."""
+        with self.slow_queries() as logs:
+            self.client.get(reverse('posts:profile', args=['auth']))
+        entries = [record.query for record in logs.records]
+        self.assertTrue(entries)
+        for entry in entries:
+            self.assertEqual(entry['url_name'], 'posts:profile')
+            self.assertEqual(entry['path'], '/profile/auth/')
+            self.assertRegex(entry['python'], r'^posts/\S+\.py:\d+ in ')
+
+    def test_template_origin(self):
+        """Ленивый запрос из шаблона указывает на строку шаблона."""
+        post = Post.objects.get(pk=self.post.pk)
+        with self.slow_queries() as logs:
+            render_to_string('posts/includes/post_card.html', {
+                'post': post, 'show_group': True,
+            })
+        templates = [record.query['template'] for record in logs.records]
+        self.assertIn(
+            'posts/includes/post_card.html:23 if show_group and post.group',
+            templates,
+        )
+
+    def test_params_are_redacted(self):
+        """Строки в параметрах не попадают в журнал, числа попадают."""
+        with self.slow_queries() as logs:
+            list(Post.objects.filter(text='секрет', pk=self.post.pk))
+        entry = logs.records[0].query
+        self.assertCountEqual(entry['params'], ['<str>', self.post.pk])
+        self.assertNotIn('секрет', json.dumps(entry, ensure_ascii=False))
+        self.assertIsNone(entry['url_name'])
+
+    def test_summary_command(self):
+        """slowqueries группирует записи по отпечатку SQL."""
+        with self.slow_queries() as logs:
+            for pk in (1, 2, 3):
+                list(Post.objects.filter(pk=pk))
+        formatter = slow_queries.JSONFormatter()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'slow.log')
+            with open(path, 'w', encoding='utf-8') as stream:
+                for record in logs.records:
+                    stream.write(formatter.format(record) + '\n')
+            groups = slow_queries.summarize(
+                slow_queries.read_entries(path)
+            )
+            output = StringIO()
+            call_command('slowqueries', log=path, stdout=output)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['count'], 3)
+        self.assertIn('"posts_post"."id" = %s', groups[0]['fingerprint'])
+        self.assertIn('     3 × ', output.getvalue())
+
+
+class ReplicaRouterTests(TestCase):
+    def test_routing(self):
+        """С реплики читаются только модели постов, запись — в default."""
+        router = replica.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        with replica.request_state('replica') as state:
+            self.assertEqual(router.db_for_read(Post), 'replica')
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_write(User), 'default')
+            self.assertFalse(state.wrote)
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertTrue(state.wrote)
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+    def test_mirror_is_not_a_replica(self):
+        """В тестах реплика — зеркало default, и чтение идёт в default."""
+        self.assertIsNone(replica.replica_alias())
+
+
+class ReplicaTests(TransactionTestCase):
+    # Реплика — отдельный файл, копируемый с закоммиченной базы.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Старый пост')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_dict = connections['replica'].settings_dict
+        self.addCleanup(
+            settings_dict.__setitem__, 'NAME', settings_dict['NAME']
+        )
+        self.addCleanup(connections['replica'].close)
+        settings_dict['NAME'] = replica.replicate(
+            os.path.join(directory, 'replica.sqlite3')
+        )
+
+    def test_feed_is_read_from_replica(self):
+        """Ленты читаются с реплики, запись видна после replicate."""
+        # bulk_create не отправляет сигналов и не меняет поколение кэша.
+        Post.objects.bulk_create([Post(author=self.user, text='Новый пост')])
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Старый пост')
+        self.assertNotContains(response, 'Новый пост')
+        bump_generation('index')
+        replica.replicate()
+        # Тестовый клиент не закрывает соединения после запроса, как это
+        # делает request_finished на сервере.
+        connections['replica'].close()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+
+    def test_stale_replica_not_cached(self):
+        """После правки постов и до replicate страницы строятся из default."""
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertIsNone(replica.replica_alias())
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Новый пост'
+        )
+        replica.replicate()
+        self.assertEqual(replica.replica_alias(), 'replica')
+
+    def test_reads_stick_to_primary_after_write(self):
+        """После своей записи клиент читает из default."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Свежий комментарий'},
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertEqual(Comment.objects.count(), 1)
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertContains(self.client.get(url), 'Свежий комментарий')
+        self.client.cookies.pop(settings.REPLICA_PIN_COOKIE)
+        self.assertNotContains(self.client.get(url), 'Свежий комментарий')
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+from sorl.thumbnail.kvstores import cached_db_kvstore
+
+from core import metrics, timing
+
+# Блокировка генерации в общем кэше: одну миниатюру не создают
+# одновременно запрос страницы и фоновая или предварительная генерация.
+LOCK_TIMEOUT = 60
+LOCK_POLL_INTERVAL = 0.05
+
+
+def lock_key(name):
+    return 'thumbnail-lock:%s' % name
+
+
+def wait_for_lock(key, timeout):
+    """Ждёт снятия блокировки key не дольше timeout секунд."""
+    deadline = time.monotonic() + timeout
+    while cache.has_key(key):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(LOCK_POLL_INTERVAL)
+    return True
+
+
+class LRUCache:
+    """Ограниченный по числу записей LRU-кэш с временем жизни записей."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """KV-хранилище sorl-thumbnail с LRU-кэшем в памяти процесса.
+
+    Порядок чтения: LRU процесса, затем общий кэш и БД (родительский
+    cached_db KVStore). Записи LRU живут THUMBNAIL_LRU_TIMEOUT секунд,
+    чтобы удаления в других процессах тоже со временем применялись.
+    Чтения по уровням считаются в метрике thumbnail_kv_lookups и в
+    Server-Timing запроса.
+    """
+
+    lru = LRUCache(
+        settings.THUMBNAIL_LRU_SIZE, settings.THUMBNAIL_LRU_TIMEOUT
+    )
+
+    def _get_raw(self, key):
+        value = self.lru.get(key)
+        if value is not None:
+            self._count('lru', 'hit')
+            return value
+        self._count('lru', 'miss')
+        value = super()._get_raw(key)
+        if value is None:
+            self._count('store', 'miss')
+        else:
+            self._count('store', 'hit')
+            self.lru.set(key, value)
+        return value
+
+    def _count(self, tier, result):
+        metrics.THUMBNAIL_KV_LOOKUPS.inc(tier=tier, result=result)
+        timing.count('thumbnail_%s_%s' % (tier, result))
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        self.lru.delete(*keys)
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        self.lru.clear()
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Бэкенд sorl-thumbnail с замером времени для Server-Timing.
+
+    Миниатюра создаётся под блокировкой lock_key(имя миниатюры). Если
+    её уже создаёт другой поток или процесс, запрос ждёт до
+    THUMBNAIL_LOCK_WAIT секунд и отдаёт готовый файл; не дождавшись,
+    создаёт миниатюру сам.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with timing.measure('thumbnail'):
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        key = lock_key(thumbnail.name)
+        locked = cache.add(key, 1, LOCK_TIMEOUT)
+        if not locked and wait_for_lock(
+            key, settings.THUMBNAIL_LOCK_WAIT
+        ) and thumbnail.exists():
+            return
+        try:
+            super()._create_thumbnail(
+                source_image, geometry_string, options, thumbnail
+            )
+        finally:
+            if locked:
+                cache.delete(key)
+        metrics.THUMBNAILS_GENERATED.inc()
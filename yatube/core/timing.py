@@ -0,0 +1,166 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+from django.db import connections
+
+_current = ContextVar('timing', default=None)
+
+# Метрика Server-Timing -> описание. Заголовки — latin-1, поэтому
+# описания на английском.
+METRICS = (
+    ('db', 'DB'),
+    ('template', 'Templates'),
+    ('cache', 'Cache'),
+    ('thumbnail', 'Thumbnails'),
+)
+
+
+class _Phase:
+    """Замер фазы; вложенные замеры той же фазы (set внутри set_many,
+    render_to_string внутри render) не суммируются повторно.
+
+    Объект один на фазу и запрос: контекстный менеджер на генераторе
+    стоил бы микросекунды на каждый запрос к кэшу.
+    """
+
+    __slots__ = ('timer', 'name', 'depth', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.depth = 0
+
+    def __enter__(self):
+        if not self.depth:
+            self.start = time.perf_counter()
+        self.depth += 1
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if not self.depth:
+            timer = self.timer
+            timer.durations[self.name] += time.perf_counter() - self.start
+            timer.counts[self.name] += 1
+
+
+class Timer:
+    """Время и счётчики фаз одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # defaultdict заметно дешевле Counter при создании на каждый запрос.
+        self.durations = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.phases = {}
+        self.request = None
+
+    def measure(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = _Phase(self, name)
+        return phase
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def header(self):
+        """Значение заголовка Server-Timing."""
+        metrics = []
+        for name, description in METRICS:
+            if name == 'db':
+                description = '%s, %d queries' % (
+                    description, self.counts['db']
+                )
+            elif name == 'cache':
+                if not self.counts['cache']:
+                    continue
+                description = '%s, %d hits, %d misses' % (
+                    description, self.counts['cache_hit'],
+                    self.counts['cache_miss'],
+                )
+            elif name == 'thumbnail':
+                if not self.counts['thumbnail']:
+                    continue
+                description = '%s, %d LRU hits, %d store lookups' % (
+                    description, self.counts['thumbnail_lru_hit'],
+                    self.counts['thumbnail_lru_miss'],
+                )
+            elif not self.counts[name]:
+                continue
+            metrics.append('%s;dur=%.1f;desc="%s"' % (
+                name, self.durations[name] * 1000, description
+            ))
+        if self.counts['page_hit'] or self.counts['page_miss']:
+            metrics.append('page;desc="%s"' % (
+                'hit' if self.counts['page_hit'] else 'miss'
+            ))
+        metrics.append('total;dur=%.1f' % (self.total * 1000))
+        return ', '.join(metrics)
+
+
+def current():
+    return _current.get()
+
+
+def _execute(execute, sql, params, many, context):
+    timer = _current.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.durations['db'] += time.perf_counter() - start
+        timer.counts['db'] += 1
+
+
+def _install(connection):
+    # Обёртка ставится навсегда и в начало списка: execute_wrapper()
+    # снимает свою обёртку pop() с конца, а вход в execute_wrapper()
+    # на каждый запрос стоил бы дороже самого замера.
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute)
+
+
+@contextmanager
+def activate(timer):
+    """Делает timer текущим для этого потока и его запросов к БД."""
+    for connection in connections.all():
+        _install(connection)
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def request_timer(request=None):
+    """Текущий замер запроса или новый, если его ещё нет."""
+    timer = _current.get()
+    if timer is not None:
+        yield timer
+        return
+    timer = Timer()
+    timer.request = request
+    with activate(timer):
+        yield timer
+
+
+_nothing = nullcontext()
+
+
+def measure(name):
+    timer = _current.get()
+    if timer is None:
+        return _nothing
+    return timer.measure(name)
+
+
+def count(name, value=1):
+    timer = _current.get()
+    if timer is not None:
+        timer.counts[name] += value
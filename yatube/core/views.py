@@ -1,4 +1,14 @@
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from core import metrics, profiling
+
+TOP_FUNCTIONS = 30
+FLAME_ROW_HEIGHT = 18
 
 
 def page_not_found(request, exception):
@@ -7,3 +17,96 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_allowed(request):
+    """Bearer-токен METRICS_TOKEN или адрес из METRICS_ALLOWED_IPS."""
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer ' + token
+    ):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.render(), content_type='text/plain; version=0.0.4'
+    )
+
+
+def top_functions(stats, limit=TOP_FUNCTIONS):
+    """Функции с наибольшим собственным временем по pstats.Stats."""
+    rows = sorted(
+        stats.stats.items(), key=lambda item: item[1][2], reverse=True
+    )[:limit]
+    return [
+        {
+            'function': profiling.label(func),
+            'calls': calls,
+            'own_ms': own * 1000,
+            'cumulative_ms': cumulative * 1000,
+        }
+        for func, (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def profiles(request):
+    """Страница админки: замеры cProfile по view и их flame graph.
+
+    ?format=folded и ?format=json отдают объединённые стеки для
+    flamegraph.pl, speedscope или d3-flame-graph.
+    """
+    views = profiling.profiled_views()
+    selected = request.GET.get('view')
+    context = dict(
+        admin.site.each_context(request),
+        title='Профили запросов',
+        views=views,
+        header=settings.PROFILING_HEADER,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        token=profiling.make_token(),
+        token_max_age=settings.PROFILING_TOKEN_MAX_AGE,
+    )
+    if selected in views:
+        stacks = profiling.merged_stacks(selected)
+        data_format = request.GET.get('format')
+        if data_format == 'folded':
+            response = HttpResponse(
+                ''.join(
+                    '%s %d\n' % item for item in sorted(stacks.items())
+                ),
+                content_type='text/plain; charset=utf-8',
+            )
+            response['Content-Disposition'] = (
+                'attachment; filename="%s.folded"' % selected
+            )
+            return response
+        tree = profiling.flame_tree(stacks)
+        if data_format == 'json':
+            return JsonResponse(tree)
+        rows = profiling.flame_rows(tree)
+        stats = profiling.merged_stats(selected)
+        context.update(
+            selected=selected,
+            total_ms=tree['value'] / 1000,
+            flame=[
+                {
+                    'top': depth * FLAME_ROW_HEIGHT,
+                    'left': left,
+                    'width': width,
+                    'name': node['name'],
+                    'ms': node['value'] / 1000,
+                }
+                for depth, left, width, node in rows
+            ],
+            flame_height=(
+                max(depth for depth, *_ in rows) + 1
+            ) * FLAME_ROW_HEIGHT if rows else 0,
+            row_height=FLAME_ROW_HEIGHT,
+            functions=top_functions(stats) if stats else [],
+        )
+    return render(request, 'core/profiles.html', context)
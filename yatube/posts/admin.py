@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post, Follow
+from .search import build_match, fts_available, matching_ids_sql
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,12 +11,21 @@ class PostAdmin(admin.ModelAdmin):
         'pub_date',
         'author',
         'group',
+        'comments_count',
     )
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        match = build_match(search_term)
+        if not match or not fts_available():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=matching_ids_sql(match)), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
@@ -24,7 +34,7 @@ class GroupAdmin(admin.ModelAdmin):
         'slug',
         'description',
     )
-    search_fields = ('text',)
+    search_fields = ('title', 'slug', 'description')
     empty_value_display = '-пусто-'
     prepopulated_fields = {"slug": ("title",)}
 
@@ -0,0 +1,180 @@
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.functional import cached_property
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+VIEWS = ('index', 'group_list', 'profile', 'post_detail', 'follow_index')
+PERCENTILES = (50, 95, 99)
+POPULAR = 10
+MEMORY_SAMPLES = 3
+# Откуда Targets берёт аргумент адреса view.
+URL_ARGUMENTS = {
+    'group_list': 'slugs',
+    'group_rss': 'slugs',
+    'group_atom': 'slugs',
+    'profile': 'usernames',
+    'profile_rss': 'usernames',
+    'profile_atom': 'usernames',
+    'post_detail': 'post_ids',
+    'post_comments': 'post_ids',
+    'add_comment': 'post_ids',
+}
+
+
+def percentile(values, percent):
+    """Значение по методу ближайшего ранга; values отсортированы."""
+    if not values:
+        return None
+    rank = max(int(round(percent / 100 * len(values))), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def dataset_size():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+    }
+
+
+def _random_pks(model, rng, count):
+    """Случайные pk без ORDER BY RANDOM(): по случайной точке диапазона."""
+    bounds = model.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return []
+    return [
+        model.objects.filter(
+            pk__gte=rng.randint(bounds['first'], bounds['last'])
+        ).order_by('pk').values_list('pk', flat=True)[0]
+        for _ in range(count)
+    ]
+
+
+class Targets:
+    """Адреса и пользователи для замеров: популярные и случайные.
+
+    Половина запросов уходит к самым активным авторам, группам и
+    обсуждаемым постам, половина — к случайным, как при реальном
+    степенном распределении трафика.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        top_authors = UserStats.objects.order_by(
+            '-posts_count'
+        ).values_list('user__username', flat=True)[:POPULAR]
+        random_authors = User.objects.filter(
+            pk__in=_random_pks(User, rng, POPULAR)
+        ).values_list('username', flat=True)
+        self.usernames = list(top_authors) + list(random_authors)
+        top_posts = Post.objects.order_by(
+            '-comments_count'
+        ).values_list('pk', flat=True)[:POPULAR]
+        self.post_ids = list(top_posts) + _random_pks(Post, rng, POPULAR)
+        top_readers = UserStats.objects.order_by(
+            '-following_count'
+        ).values_list('user_id', flat=True)[:POPULAR]
+        self.reader_ids = list(top_readers) + _random_pks(
+            User, rng, POPULAR
+        )
+
+    def url(self, view):
+        """Адрес очередного запроса к view или None, если данных нет."""
+        if view in ('index', 'index_rss', 'index_atom', 'follow_index'):
+            return reverse('posts:' + view)
+        if view == 'search':
+            if not self.words:
+                return None
+            return '%s?q=%s' % (
+                reverse('posts:search'), quote(self.rng.choice(self.words))
+            )
+        values = getattr(self, URL_ARGUMENTS[view])
+        if not values:
+            return None
+        return reverse('posts:' + view, args=(self.rng.choice(values),))
+
+    @cached_property
+    def words(self):
+        texts = Post.objects.filter(
+            pk__in=self.post_ids
+        ).values_list('text', flat=True)
+        return [word for text in texts for word in text.split()[:3]]
+
+    def request(self, view):
+        """(url, id пользователя или None) для очередного запроса."""
+        if view != 'follow_index':
+            return self.url(view), None
+        if not self.reader_ids:
+            return None, None
+        return self.url(view), self.rng.choice(self.reader_ids)
+
+
+@contextmanager
+def _traced_memory(result):
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        result.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+
+def benchmark_view(view, targets, requests, clients):
+    latencies, queries, peaks, errors = [], [], [], 0
+    for index in range(requests + MEMORY_SAMPLES):
+        url, user_id = targets.request(view)
+        if url is None:
+            break
+        client = clients.get(user_id)
+        if client is None:
+            client = clients[user_id] = Client()
+            client.force_login(User.objects.get(pk=user_id))
+        if index >= requests:
+            with _traced_memory(peaks):
+                client.get(url)
+            continue
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(len(context))
+        if response.status_code >= 400:
+            errors += 1
+    latencies.sort()
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'mean_queries': sum(queries) / len(queries) if queries else None,
+        'max_queries': max(queries, default=None),
+        'peak_memory_kb': max(peaks, default=0) // 1024,
+    }
+    for percent in PERCENTILES:
+        result['p%d_ms' % percent] = percentile(latencies, percent)
+    return result
+
+
+def run_benchmark(requests=200, views=VIEWS, seed=0):
+    """Замеры задержки, числа запросов и пиковой памяти по каждой view."""
+    rng = random.Random(seed)
+    targets = Targets(rng)
+    clients = {None: Client()}
+    return {
+        'dataset': dataset_size(),
+        'views': {
+            view: benchmark_view(view, targets, requests, clients)
+            for view in views
+        },
+    }
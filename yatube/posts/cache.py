@@ -0,0 +1,105 @@
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+
+from core import timing
+
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def version_key(kind, pk):
+    return 'version:%s:%s' % (kind, pk)
+
+
+def new_version():
+    return time.time_ns()
+
+
+def get_versions(keys):
+    """Возвращает версии по ключам, заводя недостающие.
+
+    Пропавшая из кэша версия заменяется новым уникальным значением,
+    а не нулём, чтобы не воскресить фрагменты старых версий.
+    """
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        cache.add(key, new_version(), None)
+    if missing:
+        versions.update(cache.get_many(missing))
+        # Кэш, который ничего не хранит (DummyCache), каждый раз даёт
+        # новую версию.
+        for key in missing:
+            versions.setdefault(key, new_version())
+    return versions
+
+
+def bump_version(kind, pk):
+    key = version_key(kind, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, new_version(), None)
+
+
+def post_card_keys(posts, variant):
+    """Ключи фрагментов карточек с учётом версий поста, группы и автора."""
+    version_keys = set()
+    for post in posts:
+        version_keys.add(version_key('post', post.id))
+        version_keys.add(version_key('user', post.author_id))
+        if post.group_id is not None:
+            version_keys.add(version_key('group', post.group_id))
+    versions = get_versions(list(version_keys))
+    return [
+        'post_card:%s:%s:%s:%s:%s' % (
+            variant,
+            post.id,
+            versions.get(version_key('post', post.id)),
+            versions.get(version_key('user', post.author_id)),
+            versions.get(version_key('group', post.group_id)),
+        )
+        for post in posts
+    ]
+
+
+def get_generation(namespace):
+    key = version_key('generation', namespace)
+    return get_versions([key])[key]
+
+
+def bump_generation(namespace):
+    bump_version('generation', namespace)
+
+
+def index_generation():
+    """Поколение 'index': меняется при правке постов, групп и авторов."""
+    return get_generation('index')
+
+
+def generation_cache_page(namespace, timeout):
+    """cache_page, чей ключ включает поколение пространства имён.
+
+    bump_generation(namespace) мгновенно делает недействительными все
+    закэшированные страницы, поэтому timeout может быть большим.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            rendered = []
+
+            def tracked_view(*args, **kwargs):
+                rendered.append(True)
+                return view(*args, **kwargs)
+
+            key_prefix = '%s.%s' % (namespace, get_generation(namespace))
+            cached_view = cache_page(timeout, key_prefix=key_prefix)(
+                tracked_view
+            )
+            response = cached_view(request, *args, **kwargs)
+            timing.count('page_miss' if rendered else 'page_hit')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,133 @@
+from django.db.models import Exists, OuterRef, Subquery
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition
+
+from .cache import get_generation, get_versions, version_key
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def weak_etag(request, *parts):
+    """Слабый ETag страницы; страницы разные для разных пользователей."""
+    return 'W/"%s"' % '-'.join(
+        str(part) for part in (request.user.pk or 0,) + parts
+    )
+
+
+def latest_post(filters):
+    """(pub_date, id) самого нового поста выборки."""
+    return Post.objects.filter(**filters).order_by(
+        '-pub_date', '-id'
+    ).values_list('pub_date', 'id').first()
+
+
+def latest_post_condition(**lookups):
+    """Условный GET по самому новому посту выборки.
+
+    lookups сопоставляют фильтр Post с аргументом URL, например
+    latest_post_condition(group__slug='slug'). В ETag входит поколение
+    'index', которое меняется при любом изменении постов, групп и
+    авторов, поэтому правки и удаления старых постов тоже меняют ETag.
+    Last-Modified не отдаётся: дата самого нового поста не меняется
+    при таких правках, а отдельной отметки времени изменений нет.
+    """
+    def etag(request, *args, **kwargs):
+        latest = latest_post(
+            {field: kwargs[arg] for field, arg in lookups.items()}
+        )
+        if latest is None:
+            return None
+        pub_date, post_id = latest
+        return '%d-%d-%s' % (
+            pub_date.timestamp(), post_id, get_generation('index')
+        )
+
+    return condition(etag_func=etag)
+
+
+def _memo(request, key, load):
+    """Объект страницы загружается один раз на запрос.
+
+    Функция ETag и сама view получают один и тот же объект, поэтому
+    проверка условного запроса не добавляет запросов к БД.
+    """
+    memo = request.__dict__.setdefault('_conditional_objects', {})
+    if key not in memo:
+        memo[key] = load()
+    return memo[key]
+
+
+def _counters(user):
+    try:
+        stats = user.stats
+    except UserStats.DoesNotExist:
+        return ()
+    return (
+        stats.posts_count, stats.followers_count, stats.following_count
+    )
+
+
+def get_post(request, post_id):
+    return _memo(request, ('post', post_id), lambda: get_object_or_404(
+        Post.objects.select_related('author__stats', 'group').annotate(
+            last_comment=Subquery(
+                Comment.objects.filter(post=OuterRef('pk'))
+                .order_by('-id')
+                .values('id')[:1]
+            )
+        ),
+        pk=post_id,
+    ))
+
+
+def get_author(request, username):
+    def load():
+        authors = User.objects.select_related('stats')
+        if request.user.is_authenticated:
+            authors = authors.annotate(is_followed=Exists(
+                Follow.objects.filter(
+                    user=request.user, author=OuterRef('pk')
+                )
+            ))
+        return get_object_or_404(authors, username=username)
+    return _memo(request, ('author', username), load)
+
+
+def get_group(request, slug):
+    return _memo(request, ('group', slug), lambda: get_object_or_404(
+        Group, slug=slug
+    ))
+
+
+def post_detail_etag(request, post_id):
+    """Версии поста, автора и группы, счётчики и последний комментарий."""
+    post = get_post(request, post_id)
+    keys = [
+        version_key('post', post.id),
+        version_key('user', post.author_id),
+        version_key('group', post.group_id),
+    ]
+    versions = get_versions(keys)
+    return weak_etag(
+        request,
+        *[versions[key] for key in keys],
+        post.comments_count,
+        post.last_comment,
+        *_counters(post.author),
+    )
+
+
+def profile_etag(request, username):
+    """Счётчики автора, подписка текущего пользователя и поколение."""
+    author = get_author(request, username)
+    return weak_etag(
+        request,
+        get_generation('index'),
+        author.pk,
+        getattr(author, 'is_followed', False),
+        *_counters(author),
+    )
+
+
+def group_etag(request, slug):
+    group = get_group(request, slug)
+    return weak_etag(request, get_generation('index'), group.pk)
@@ -0,0 +1,92 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+# Поля выгрузки: имя в файле -> путь в values_list.
+FIELDS = {
+    'posts': (
+        ('id', 'id'),
+        ('author', 'author__username'),
+        ('group', 'group__slug'),
+        ('text', 'text'),
+        ('pub_date', 'pub_date'),
+        ('comments_count', 'comments_count'),
+    ),
+    'comments': (
+        ('id', 'id'),
+        ('post', 'post_id'),
+        ('author', 'author__username'),
+        ('text', 'text'),
+        ('created', 'created'),
+    ),
+}
+
+
+def export_queryset(data, group=None, author=None):
+    if data == 'posts':
+        queryset = Post.objects.all()
+        prefix = ''
+    else:
+        queryset = Comment.objects.filter(post__isnull=False)
+        prefix = 'post__'
+    if group is not None:
+        queryset = queryset.filter(**{prefix + 'group': group})
+    if author is not None:
+        queryset = queryset.filter(**{prefix + 'author': author})
+    return queryset
+
+
+def iter_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """Отдаёт строки короткими запросами по первичному ключу.
+
+    Каждая пачка читается отдельным запросом WHERE id > последний id,
+    поэтому выгрузка не держит открытым курсор (и блокировку чтения
+    SQLite) всё время передачи ответа.
+    """
+    queryset = queryset.order_by('pk').values_list('pk', *fields)
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(chunk[:chunk_size])
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][0]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(rows, names):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(names, row)), cls=DjangoJSONEncoder, ensure_ascii=False
+        ) + '\n'
+
+
+def csv_lines(rows, names):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+WRITERS = {'ndjson': ndjson_lines, 'csv': csv_lines}
+
+
+def export_lines(data, data_format, group=None, author=None):
+    """Построчная выгрузка постов или комментариев группы или автора."""
+    names, fields = zip(*FIELDS[data])
+    rows = iter_rows(export_queryset(data, group, author), fields)
+    return WRITERS[data_format](rows, names)
@@ -0,0 +1,111 @@
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .conditional import latest_post_condition
+from .models import Group, Post, User
+
+FEED_SIZE = 20
+TITLE_LETTERS = 30
+
+
+class LatestPostsFeed(Feed):
+    title = 'Последние обновления на сайте'
+    description = 'Новые записи всех пользователей Yatube.'
+
+    def __call__(self, request, *args, **kwargs):
+        # Feed ставит Last-Modified по дате самого нового поста, но
+        # правки и удаления старых постов её не меняют; свежесть ленты
+        # проверяется только по ETag из latest_post_condition.
+        response = super().__call__(request, *args, **kwargs)
+        del response['Last-Modified']
+        return response
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return Post.objects.select_related('author')[:FEED_SIZE]
+
+    def item_title(self, item):
+        return item.text[:TITLE_LETTERS]
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=(item.id,))
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return 'Записи сообщества %s' % group.title
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=(group.slug,))
+
+    def items(self, group):
+        return group.posts.select_related('author')[:FEED_SIZE]
+
+
+class ProfilePostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return 'Записи пользователя %s' % (
+            author.get_full_name() or author.username
+        )
+
+    def description(self, author):
+        return self.title(author)
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def items(self, author):
+        return author.posts.select_related('author')[:FEED_SIZE]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, group):
+        return group.description
+
+
+class ProfilePostsAtomFeed(ProfilePostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, author):
+        return self.description(author)
+
+
+index_condition = latest_post_condition()
+group_condition = latest_post_condition(group__slug='slug')
+profile_condition = latest_post_condition(author__username='username')
+
+index_rss = index_condition(LatestPostsFeed())
+index_atom = index_condition(LatestPostsAtomFeed())
+group_rss = group_condition(GroupPostsFeed())
+group_atom = group_condition(GroupPostsAtomFeed())
+profile_rss = profile_condition(ProfilePostsFeed())
+profile_atom = profile_condition(ProfilePostsAtomFeed())
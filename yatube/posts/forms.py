@@ -1,5 +1,9 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from core.metrics import POST_IMAGE_BYTES
+
+from .images import normalize_image
 from .models import Comment, Post
 
 
@@ -8,6 +12,14 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            POST_IMAGE_BYTES.observe(image.size, stage='uploaded')
+            image = normalize_image(image)
+            POST_IMAGE_BYTES.observe(image.size, stage='stored')
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,126 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+LOSSY_FORMATS = ('JPEG', 'WEBP')
+QUALITY_STEPS = (85, 75, 65, 55)
+SCALE_STEP = 0.75
+# Прозрачные области заливаются цветом фона страницы: sorl-thumbnail
+# пишет миниатюры в JPEG, а индекс прозрачности GIF после смены
+# палитры указывал бы не на тот цвет.
+BACKGROUND = 'white'
+
+
+def _open(upload):
+    """Читает только заголовок изображения и проверяет ограничения."""
+    if upload.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': settings.POST_IMAGE_MAX_UPLOAD_SIZE >> 20},
+        )
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Загрузите корректное изображение.', code='invalid_image'
+        )
+    if image.format not in FORMATS:
+        raise ValidationError(
+            'Формат %(format)s не поддерживается.',
+            code='invalid_format',
+            params={'format': image.format},
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Изображение слишком большое: %(width)d×%(height)d.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+    return image
+
+
+def _flatten(image):
+    if image.mode not in ('RGBA', 'LA', 'PA') and (
+            'transparency' not in image.info):
+        return image
+    image = image.convert('RGBA')
+    background = Image.new('RGBA', image.size, BACKGROUND)
+    return Image.alpha_composite(background, image).convert('RGB')
+
+
+def _decode(image):
+    """Декодирует первый кадр, по возможности сразу в уменьшенном виде."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    if image.format == 'JPEG':
+        image.draft('RGB', (max_side, max_side))
+    image.seek(0)
+    image = _flatten(ImageOps.exif_transpose(image))
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    # exif, icc_profile, комментарии не переносятся в сохранённый файл.
+    image.info = {}
+    return image
+
+
+def _encode(image, image_format, quality):
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    if image_format == 'GIF' and image.mode not in ('P', 'L'):
+        image = image.convert('P', palette=Image.ADAPTIVE)
+    output = BytesIO()
+    options = {'optimize': True}
+    if image_format in LOSSY_FORMATS:
+        options['quality'] = quality
+    if image_format == 'JPEG':
+        options['progressive'] = True
+    image.save(output, image_format, **options)
+    return output
+
+
+def _encode_within_limit(image, image_format):
+    qualities = QUALITY_STEPS if image_format in LOSSY_FORMATS else (None,)
+    while True:
+        for quality in qualities:
+            output = _encode(image, image_format, quality)
+            if output.tell() <= settings.POST_IMAGE_MAX_BYTES:
+                return output
+        width, height = image.size
+        if min(width, height) <= 1:
+            raise ValidationError(
+                'Не удалось уменьшить изображение.', code='too_large'
+            )
+        image = image.resize(
+            (int(width * SCALE_STEP) or 1, int(height * SCALE_STEP) or 1),
+            Image.LANCZOS,
+        )
+
+
+def normalize_image(upload):
+    """Приводит загруженное изображение к предсказуемому виду.
+
+    Загрузка не декодируется целиком до проверки размеров. Из
+    результата удалены метаданные (EXIF, ICC, комментарии), прозрачные
+    области залиты BACKGROUND, большая сторона не превышает
+    POST_IMAGE_MAX_SIDE, а размер файла — POST_IMAGE_MAX_BYTES. Формат
+    и имя файла сохраняются.
+    """
+    source = _open(upload)
+    image_format = source.format
+    output = _encode_within_limit(_decode(source), image_format)
+    source.close()
+    size = output.tell()
+    output.seek(0)
+    return InMemoryUploadedFile(
+        output, 'image', upload.name, FORMATS[image_format], size, None
+    )
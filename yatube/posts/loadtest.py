@@ -0,0 +1,474 @@
+import http.client
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from copy import copy
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import unquote, urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY,
+)
+from django.core.signals import got_request_exception
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler,
+)
+from django.db import connections
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .benchmark import URL_ARGUMENTS, Targets, percentile
+from .models import Post, User
+
+# Аргументы view, которые есть только у нагрузочного теста: запись и
+# выгрузки доступны лишь пользователям с сессией.
+SESSION_URL_ARGUMENTS = {
+    'profile_follow': 'usernames',
+    'profile_unfollow': 'usernames',
+    'group_export': 'slugs',
+    'profile_export': 'usernames',
+}
+VIEWS = (
+    'index', 'index_rss', 'index_atom', 'search', 'follow_index',
+    'post_create', 'post_edit',
+) + tuple(URL_ARGUMENTS) + tuple(SESSION_URL_ARGUMENTS)
+DEFAULT_MIX = {
+    'index': 30,
+    'group_list': 15,
+    'profile': 15,
+    'post_detail': 20,
+    'post_comments': 5,
+    'search': 5,
+    'index_rss': 5,
+    'follow_index': 5,
+}
+LOGIN_REQUIRED = {
+    'follow_index', 'add_comment', 'post_create', 'post_edit',
+} | set(SESSION_URL_ARGUMENTS)
+POST_VIEWS = {'add_comment', 'post_create', 'post_edit'}
+EXPORT_VIEWS = {'group_export', 'profile_export'}
+EXPORT_FORMATS = ('ndjson', 'csv')
+COMMENT_TEXT = 'Комментарий нагрузочного теста'
+POST_TEXT = 'Пост нагрузочного теста'
+# Сколько своих постов виртуальный пользователь редактирует в post_edit.
+OWN_POSTS = 10
+# Верхние границы корзин гистограммы задержек, мс.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def parse_mix(text):
+    """'index=30,profile=10' -> {'index': 30.0, 'profile': 10.0}."""
+    mix = {}
+    for item in text.split(','):
+        view, _, weight = item.partition('=')
+        view = view.strip()
+        if view not in VIEWS:
+            raise ValueError('Неизвестная view: %s' % view)
+        mix[view] = float(weight or 1)
+        if mix[view] < 0:
+            raise ValueError('Отрицательный вес: %s' % item)
+    return mix
+
+
+def histogram(latencies):
+    """[(верхняя граница в мс или None для хвоста, число запросов)]."""
+    counts = Counter()
+    for latency in latencies:
+        bound = next((bound for bound in BUCKETS if latency <= bound), None)
+        counts[bound] += 1
+    return [(bound, counts[bound]) for bound in BUCKETS + (None,)]
+
+
+class WSGITransport:
+    """Вызов WSGI-приложения в том же потоке, без сокетов."""
+
+    name = 'wsgi'
+
+    def __init__(self, application, host):
+        self.application = application
+        self.host = host
+
+    def __call__(self, method, url, headers, body=b''):
+        parts = urlsplit(url)
+        environ = {
+            'REQUEST_METHOD': method,
+            # PATH_INFO по PEP 3333 — байты UTF-8, прочитанные как latin-1.
+            'PATH_INFO': unquote(parts.path).encode().decode('iso-8859-1'),
+            'QUERY_STRING': parts.query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            key = name.upper().replace('-', '_')
+            if key != 'CONTENT_TYPE':
+                key = 'HTTP_' + key
+            environ[key] = value
+        status = []
+
+        def start_response(status_line, response_headers, exc_info=None):
+            status.append(int(status_line[:3]))
+
+        result = self.application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            # close() отправляет request_finished: Django закрывает
+            # соединения с БД, как после настоящего запроса.
+            if hasattr(result, 'close'):
+                result.close()
+        return status[0]
+
+    def close(self):
+        pass
+
+
+class HTTPTransport:
+    """HTTP/1.1 с keep-alive: своё соединение у каждого потока."""
+
+    name = 'server'
+
+    def __init__(self, address, host):
+        self.address = address
+        self.host = host
+        self.local = threading.local()
+
+    def __call__(self, method, url, headers, body=b''):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(
+                *self.address
+            )
+        headers = dict(headers, Host=self.host)
+        try:
+            connection.request(method, url, body or None, headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            raise
+        return response.status
+
+    def close(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            connection.close()
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def local_server(application):
+    """Многопоточный WSGI-сервер Django на свободном порту 127.0.0.1."""
+    server = ThreadedWSGIServer(
+        ('127.0.0.1', 0), _QuietRequestHandler, allow_reuse_address=False
+    )
+    server.set_app(application)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def create_session(user):
+    """Сессия вошедшего пользователя без проверки пароля."""
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return session
+
+
+class SessionTargets:
+    """Адреса и тела запросов, зависящие от пользователя сессии.
+
+    post_edit правит последние OWN_POSTS постов пользователя, сохраняя
+    их группу. profile_unfollow отписывает от авторов, на которых
+    пользователь подписался в этом тесте, а пока таких нет — от
+    случайного автора (ответ 404).
+    """
+
+    def __init__(self, user):
+        self.session = create_session(user)
+        self.posts = list(
+            Post.objects.filter(author=user).order_by('-pk').values_list(
+                'pk', 'group_id'
+            )[:OWN_POSTS]
+        )
+        self.followed = []
+
+    def available(self, view, targets):
+        if view == 'post_create':
+            return True
+        if view == 'post_edit':
+            return bool(self.posts)
+        if view in SESSION_URL_ARGUMENTS:
+            return bool(getattr(targets, SESSION_URL_ARGUMENTS[view]))
+        return targets.url(view) is not None
+
+    def request(self, view, targets):
+        """(адрес, поля формы или None для GET) очередного запроса."""
+        if view == 'post_create':
+            return reverse('posts:post_create'), {'text': POST_TEXT}
+        if view == 'post_edit':
+            post_id, group_id = targets.rng.choice(self.posts)
+            form = {'text': POST_TEXT}
+            if group_id is not None:
+                form['group'] = group_id
+            return reverse('posts:post_edit', args=(post_id,)), form
+        if view == 'profile_unfollow' and self.followed:
+            username = self.followed.pop()
+        elif view in SESSION_URL_ARGUMENTS:
+            username = targets.rng.choice(
+                getattr(targets, SESSION_URL_ARGUMENTS[view])
+            )
+        else:
+            form = {'text': COMMENT_TEXT} if view in POST_VIEWS else None
+            return targets.url(view), form
+        if view == 'profile_follow':
+            self.followed.append(username)
+        url = reverse('posts:' + view, args=(username,))
+        if view in EXPORT_VIEWS:
+            url += '?format=' + targets.rng.choice(EXPORT_FORMATS)
+        return url, None
+
+
+class Stats:
+    """Потокобезопасный сбор задержек, статусов и исключений."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.exceptions = Counter()
+
+    def record(self, view, status, latency):
+        with self.lock:
+            self.latencies[view].append(latency)
+            self.statuses[view][status] += 1
+
+    def record_exception(self, error):
+        message = str(error).splitlines()[0] if str(error) else ''
+        with self.lock:
+            self.exceptions['%s: %s' % (type(error).__name__, message)] += 1
+
+    @staticmethod
+    def errors(statuses):
+        """Ошибки: 5xx и запросы, не получившие ответа (статус None)."""
+        return sum(
+            count for status, count in statuses.items()
+            if status is None or status >= 500
+        )
+
+    @staticmethod
+    def latency_summary(latencies):
+        latencies = sorted(latencies)
+        summary = {
+            'p%d_ms' % percent: percentile(latencies, percent)
+            for percent in (50, 90, 95, 99)
+        }
+        summary['max_ms'] = latencies[-1] if latencies else None
+        summary['mean_ms'] = (
+            sum(latencies) / len(latencies) if latencies else None
+        )
+        return summary
+
+    def summary(self, elapsed):
+        every = [
+            latency for latencies in self.latencies.values()
+            for latency in latencies
+        ]
+        statuses = Counter()
+        views = {}
+        for view, latencies in sorted(self.latencies.items()):
+            statuses.update(self.statuses[view])
+            views[view] = dict(
+                self.latency_summary(latencies),
+                requests=len(latencies),
+                errors=self.errors(self.statuses[view]),
+                statuses={
+                    str(status): count
+                    for status, count in self.statuses[view].items()
+                },
+            )
+        errors = self.errors(statuses)
+        return dict(
+            self.latency_summary(every),
+            requests=len(every),
+            elapsed_s=elapsed,
+            rps=len(every) / elapsed if elapsed else None,
+            errors=errors,
+            error_rate=errors / len(every) if every else None,
+            statuses={
+                str(status): count for status, count in statuses.items()
+            },
+            exceptions=dict(self.exceptions.most_common()),
+            histogram=histogram(every),
+            views=views,
+        )
+
+
+class LoadTest:
+    """Замкнутая модель нагрузки: concurrency виртуальных пользователей.
+
+    Каждый виртуальный пользователь — поток, который выбирает view по
+    весам mix, ждёт ответа и «думает» случайное время со средним
+    think_time (экспоненциальное распределение). Доля logged_in
+    пользователей работает с сессией и CSRF-токеном, им доступны
+    view из LOGIN_REQUIRED; view из POST_VIEWS отправляют форму и
+    пишут в базу. Тест идёт duration секунд или до
+    requests запросов — что наступит раньше.
+    """
+
+    def __init__(self, transport, mix=None, concurrency=10, logged_in=0.3,
+                 think_time=0.0, duration=10.0, requests=None, seed=0):
+        self.transport = transport
+        self.mix = dict(DEFAULT_MIX if mix is None else mix)
+        self.concurrency = concurrency
+        self.logged_in = logged_in
+        self.think_time = think_time
+        self.duration = duration
+        self.requests = requests
+        self.seed = seed
+        self.stats = Stats()
+        self.lock = threading.Lock()
+        self.issued = 0
+
+    def _take(self, deadline):
+        """Разрешение на очередной запрос."""
+        if time.monotonic() >= deadline:
+            return False
+        with self.lock:
+            if self.requests is not None and self.issued >= self.requests:
+                return False
+            self.issued += 1
+            return True
+
+    def _views(self, targets, session):
+        if session is None:
+            views = [
+                view for view, weight in self.mix.items()
+                if weight > 0 and view not in LOGIN_REQUIRED
+                and targets.url(view) is not None
+            ]
+        else:
+            views = [
+                view for view, weight in self.mix.items()
+                if weight > 0 and session.available(view, targets)
+            ]
+        return views, [self.mix[view] for view in views]
+
+    def _worker(self, index, targets, session, deadline):
+        rng = random.Random('%s:%s' % (self.seed, index))
+        targets = copy(targets)
+        targets.rng = rng
+        headers = {}
+        if session is not None:
+            token = get_random_string(32)
+            headers['Cookie'] = '%s=%s; %s=%s' % (
+                settings.SESSION_COOKIE_NAME, session.session.session_key,
+                settings.CSRF_COOKIE_NAME, token,
+            )
+            headers['X-CSRFToken'] = token
+        views, weights = self._views(targets, session)
+        try:
+            while views and self._take(deadline):
+                view = rng.choices(views, weights)[0]
+                if session is None:
+                    url, form = targets.url(view), None
+                else:
+                    url, form = session.request(view, targets)
+                method, body, request_headers = 'GET', b'', headers
+                if form is not None:
+                    method = 'POST'
+                    body = urlencode(form).encode()
+                    request_headers = dict(
+                        headers,
+                        **{'Content-Type':
+                           'application/x-www-form-urlencoded'}
+                    )
+                start = time.perf_counter()
+                try:
+                    status = self.transport(
+                        method, url, request_headers, body
+                    )
+                except Exception as error:
+                    status = None
+                    self.stats.record_exception(error)
+                self.stats.record(
+                    view, status, (time.perf_counter() - start) * 1000
+                )
+                if self.think_time:
+                    time.sleep(rng.expovariate(1 / self.think_time))
+        finally:
+            self.transport.close()
+            connections.close_all()
+
+    def _on_exception(self, sender, request=None, **kwargs):
+        self.stats.record_exception(sys.exc_info()[1])
+
+    def run(self):
+        targets = Targets(random.Random(self.seed))
+        # Заполняем ленивый список слов до копирования в потоки.
+        targets.words
+        readers = User.objects.filter(pk__in=targets.reader_ids)
+        readers = list(readers) or list(User.objects.all()[:1])
+        logged_in = round(self.concurrency * self.logged_in) if readers else 0
+        sessions = [
+            SessionTargets(readers[index % len(readers)])
+            for index in range(logged_in)
+        ]
+        sessions += [None] * (self.concurrency - logged_in)
+        got_request_exception.connect(self._on_exception)
+        start = time.monotonic()
+        deadline = start + self.duration
+        threads = [
+            threading.Thread(
+                target=self._worker, args=(index, targets, session, deadline)
+            )
+            for index, session in enumerate(sessions)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            got_request_exception.disconnect(self._on_exception)
+            for session in sessions:
+                if session is not None:
+                    session.session.delete()
+        summary = self.stats.summary(time.monotonic() - start)
+        summary.update(
+            mode=self.transport.name,
+            concurrency=self.concurrency,
+            logged_in=logged_in,
+            think_time_s=self.think_time,
+            mix=self.mix,
+        )
+        return summary
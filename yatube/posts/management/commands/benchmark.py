@@ -0,0 +1,167 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from posts.benchmark import PERCENTILES, VIEWS, run_benchmark
+from posts.seed import seed
+
+COLUMNS = tuple('p%d_ms' % percent for percent in PERCENTILES) + (
+    'mean_queries', 'peak_memory_kb',
+)
+
+
+@contextmanager
+def mirror_replica():
+    """Реплика указывает на default, как TEST MIRROR в тестах.
+
+    Иначе замеры на временной базе читали бы ленты с реплики рабочей.
+    """
+    if settings.REPLICA_DATABASE not in settings.DATABASES:
+        yield
+        return
+    replica = connections[settings.REPLICA_DATABASE]
+    old_name = replica.settings_dict['NAME']
+    replica.close()
+    replica.settings_dict['NAME'] = connection.settings_dict['NAME']
+    try:
+        yield
+    finally:
+        replica.close()
+        replica.settings_dict['NAME'] = old_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку (p50/p95/p99), число запросов и пиковую память '
+        'страниц постов на текущей базе или на синтетических базах '
+        'нескольких размеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--views', default=','.join(VIEWS),
+            help='Список view через запятую.',
+        )
+        parser.add_argument(
+            '--sizes',
+            help='Размеры (число постов) через запятую. Для каждого '
+                 'создаётся и заполняется временная база.',
+        )
+        parser.add_argument('--alpha', type=float, default=1.2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Замерять без кэша (DummyCache).',
+        )
+        parser.add_argument('--output', help='JSON-файл для результатов.')
+        parser.add_argument(
+            '--compare', help='JSON-файл прошлого запуска для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        views = [name for name in options['views'].split(',') if name]
+        unknown = set(views) - set(VIEWS)
+        if unknown:
+            raise CommandError('Неизвестные view: %s' % ', '.join(unknown))
+        previous = self.load(options['compare']) if options['compare'] else []
+        runs = []
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                CACHES=self.caches(directory, options['no_cache']),
+                ALLOWED_HOSTS=['testserver'],
+            ):
+                if options['sizes']:
+                    for size in options['sizes'].split(','):
+                        runs.append(self.run_on_seeded_database(
+                            int(size), directory, views, options
+                        ))
+                else:
+                    runs.append(run_benchmark(
+                        options['requests'], views, options['seed']
+                    ))
+        started = datetime.now().isoformat(timespec='seconds')
+        for run in runs:
+            run['started'] = started
+            run['cache'] = not options['no_cache']
+            self.report(run, previous)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(runs, stream, ensure_ascii=False, indent=2)
+
+    def caches(self, directory, no_cache):
+        if no_cache:
+            backend = {'BACKEND': 'django.core.cache.backends.dummy.'
+                                  'DummyCache'}
+        else:
+            backend = {
+                'BACKEND': 'core.cache.SQLiteCache',
+                'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+            }
+        return {'default': backend}
+
+    def run_on_seeded_database(self, size, directory, views, options):
+        """Временная база через механизм тестовых БД Django."""
+        self.stdout.write('Заполнение базы: %d постов...' % size)
+        test_settings = connection.settings_dict['TEST']
+        old_test_name = test_settings.get('NAME')
+        test_settings['NAME'] = os.path.join(directory, 'db-%d.sqlite3' % size)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            seed(
+                size, max(size // 20, 2), max(min(size // 200, 500), 1),
+                alpha=options['alpha'], seed=options['seed'],
+                batch_size=2000,
+            )
+            with mirror_replica():
+                return run_benchmark(
+                    options['requests'], views, options['seed']
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = old_test_name
+
+    def load(self, path):
+        try:
+            with open(path, encoding='utf-8') as stream:
+                return json.load(stream)
+        except (OSError, ValueError) as error:
+            raise CommandError('Не удалось прочитать %s: %s' % (path, error))
+
+    def report(self, run, previous):
+        posts = run['dataset']['posts']
+        baseline = next(
+            (item for item in previous if item['dataset']['posts'] == posts),
+            None,
+        )
+        self.stdout.write(
+            '\nПостов: %(posts)d, пользователей: %(users)d, '
+            'комментариев: %(comments)d, подписок: %(follows)d'
+            % run['dataset']
+        )
+        self.stdout.write(
+            '%-14s' % 'view' + ''.join('%16s' % name for name in COLUMNS)
+        )
+        for view, result in run['views'].items():
+            cells = []
+            for column in COLUMNS:
+                value = result[column]
+                cell = '-' if value is None else '%.1f' % value
+                old = baseline and baseline['views'].get(view, {}).get(column)
+                if value is not None and old:
+                    cell += ' (%+.0f%%)' % ((value - old) / old * 100)
+                cells.append('%16s' % cell)
+            self.stdout.write('%-14s' % view + ''.join(cells))
+            if result['errors']:
+                self.stdout.write(self.style.WARNING(
+                    '  ошибок: %d' % result['errors']
+                ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FIELDS, FORMATS, export_lines
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты или комментарии группы или автора.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='slug группы.')
+        parser.add_argument('--author', help='Имя пользователя автора.')
+        parser.add_argument(
+            '--data', choices=sorted(FIELDS), default='posts'
+        )
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS), default='ndjson'
+        )
+        parser.add_argument('--output', help='Файл; по умолчанию stdout.')
+
+    def handle(self, *args, **options):
+        scope = {}
+        try:
+            if options['group']:
+                scope['group'] = Group.objects.get(slug=options['group'])
+            if options['author']:
+                scope['author'] = User.objects.get(
+                    username=options['author']
+                )
+        except (Group.DoesNotExist, User.DoesNotExist) as error:
+            raise CommandError(error)
+        lines = export_lines(options['data'], options['format'], **scope)
+        if options['output']:
+            with open(
+                options['output'], 'w', encoding='utf-8', newline=''
+            ) as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,65 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import MODELS, POSTS_MEMORY, READERS, Importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует пользователей, группы, посты, комментарии '
+        'и подписки из JSONL или CSV. Соответствие внешних id '
+        'пользователей и групп хранится в памяти целиком (около 120 МБ '
+        'на миллион пользователей), постов — в пределах --posts-memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для импорта или - для stdin.')
+        parser.add_argument('--format', choices=sorted(READERS))
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--progress', type=int, default=10000)
+        parser.add_argument(
+            '--posts-memory', type=int, default=POSTS_MEMORY,
+            help='Сколько последних постов помнить для привязки '
+                 'комментариев; 0 — все.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format']
+        if data_format is None:
+            data_format = os.path.splitext(path)[1].lstrip('.').lower()
+        if data_format not in READERS:
+            raise CommandError('Укажите формат: --format jsonl или csv.')
+        importer = Importer(
+            batch_size=options['batch_size'],
+            posts_memory=options['posts_memory'] or None,
+        )
+        stream = sys.stdin if path == '-' else open(
+            path, encoding='utf-8', newline=''
+        )
+        try:
+            for record in READERS[data_format](stream):
+                importer.add(record)
+                if importer.read % options['progress'] == 0:
+                    self.stdout.write('%d записей, %.0f записей/с' % (
+                        importer.read, importer.rate
+                    ))
+            importer.finish()
+        except (KeyError, ValueError) as error:
+            raise CommandError(
+                'Ошибка в записи %d: %s' % (importer.read, error)
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        for model in MODELS:
+            self.stdout.write('%s: %d' % (model, importer.created[model]))
+        self.stdout.write(self.style.SUCCESS(
+            'Импортировано записей: %d из %d, пропущено: %d, '
+            '%.0f записей/с.' % (
+                sum(importer.created.values()), importer.read,
+                importer.skipped, importer.rate,
+            )
+        ))
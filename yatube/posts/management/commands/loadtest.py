@@ -0,0 +1,132 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.loadtest import (
+    DEFAULT_MIX, HTTPTransport, LoadTest, WSGITransport, local_server,
+    parse_mix,
+)
+
+BAR_WIDTH = 40
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест yatube.wsgi.application в этом процессе: '
+        'напрямую (--mode wsgi) или через локальный многопоточный сервер '
+        '(--mode server). Печатает RPS, перцентили и гистограмму задержек, '
+        'долю ошибок и исключения вроде «database is locked».'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=('wsgi', 'server'), default='wsgi'
+        )
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Длительность теста, секунд.',
+        )
+        parser.add_argument(
+            '--requests', type=int,
+            help='Остановиться после этого числа запросов.',
+        )
+        parser.add_argument(
+            '--logged-in', type=float, default=0.3,
+            help='Доля виртуальных пользователей с сессией.',
+        )
+        parser.add_argument(
+            '--think-time', type=float, default=0.0,
+            help='Средняя пауза между запросами одного пользователя, с.',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join('%s=%s' % item for item in DEFAULT_MIX.items()),
+            help='Веса view через запятую. add_comment, post_create, '
+                 'post_edit, profile_follow и profile_unfollow пишут в '
+                 'базу.',
+        )
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='JSON-файл для результатов.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency должно быть не меньше 1.')
+        if not 0 <= options['logged_in'] <= 1:
+            raise CommandError('--logged-in должно быть от 0 до 1.')
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        from yatube.wsgi import application
+
+        def run(transport):
+            return LoadTest(
+                transport, mix,
+                concurrency=options['concurrency'],
+                logged_in=options['logged_in'],
+                think_time=options['think_time'],
+                duration=options['duration'],
+                requests=options['requests'],
+                seed=options['seed'],
+            ).run()
+
+        if options['mode'] == 'server':
+            with local_server(application) as address:
+                result = run(HTTPTransport(address, options['host']))
+        else:
+            result = run(WSGITransport(application, options['host']))
+        self.report(result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(result, stream, ensure_ascii=False, indent=2)
+
+    def report(self, result):
+        self.stdout.write(
+            'Режим %(mode)s, потоков %(concurrency)d (с сессией '
+            '%(logged_in)d), пауза %(think_time_s).2f с' % result
+        )
+        if not result['requests']:
+            self.stdout.write(self.style.WARNING('Нет ни одного запроса.'))
+            return
+        self.stdout.write(
+            'Запросов: %(requests)d за %(elapsed_s).1f с, %(rps).1f в '
+            'секунду, ошибок: %(errors)d (%(error_rate).2f%%)' % dict(
+                result, error_rate=result['error_rate'] * 100
+            )
+        )
+        self.stdout.write('Статусы: %s' % ', '.join(
+            '%s: %d' % item for item in sorted(result['statuses'].items())
+        ))
+        self.stdout.write('\n%-14s %8s %8s %8s %8s %8s %8s' % (
+            'view', 'запросов', 'ошибок', 'p50', 'p95', 'p99', 'max'
+        ))
+        for view, stats in result['views'].items():
+            self.stdout.write(
+                '%-14s %8d %8d %8.1f %8.1f %8.1f %8.1f' % (
+                    view, stats['requests'], stats['errors'],
+                    stats['p50_ms'], stats['p95_ms'], stats['p99_ms'],
+                    stats['max_ms'],
+                )
+            )
+        self.stdout.write(
+            '\nВсе %(requests)d: p50 %(p50_ms).1f, p90 %(p90_ms).1f, '
+            'p95 %(p95_ms).1f, p99 %(p99_ms).1f, max %(max_ms).1f мс'
+            % result
+        )
+        self.stdout.write('\nГистограмма задержек, мс:')
+        largest = max(count for _, count in result['histogram'])
+        lower = 0
+        for bound, count in result['histogram']:
+            label = '>%s' % lower if bound is None else '%s-%s' % (
+                lower, bound
+            )
+            self.stdout.write('%10s %7d %s' % (
+                label, count, '#' * round(BAR_WIDTH * count / largest)
+            ))
+            lower = bound
+        if result['exceptions']:
+            self.stdout.write(self.style.WARNING('\nИсключения:'))
+            for message, count in result['exceptions'].items():
+                self.stdout.write('%7d %s' % (count, message))
@@ -0,0 +1,66 @@
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+GENERATED = 'generated'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+def generate(name):
+    """Создаёт миниатюры одного изображения, ошибка не прерывает обход."""
+    try:
+        return GENERATED if thumbnails.generate(name) else SKIPPED
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s', name)
+        return FAILED
+
+
+def generate_in_thread(name):
+    try:
+        return generate(name)
+    finally:
+        for connection in connections.all():
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры для изображений постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).iterator()
+        workers = options['workers']
+        if workers <= 1:
+            results = Counter(map(generate, names))
+        else:
+            results = self.generate_parallel(names, workers)
+        self.stdout.write(self.style.SUCCESS(
+            'Обработано изображений: %d' % results[GENERATED]
+        ))
+        if results[FAILED]:
+            self.stdout.write(self.style.WARNING(
+                'Не удалось обработать изображений: %d' % results[FAILED]
+            ))
+
+    def generate_parallel(self, names, workers):
+        results = Counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                chunk = list(islice(names, workers * 10))
+                if not chunk:
+                    return results
+                results.update(executor.map(generate_in_thread, chunk))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seed import seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками со степенным распределением.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--users', type=int, help='По умолчанию posts / 20.'
+        )
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона; больше — сильнее перекос.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        posts = options['posts']
+        users = options['users'] or max(posts // 20, 2)
+        if posts < 0 or users < 1 or options['groups'] < 0:
+            raise CommandError('Размеры должны быть положительными.')
+        importer = seed(
+            posts, users, options['groups'],
+            alpha=options['alpha'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            progress=lambda importer: self.stdout.write(
+                '%d записей, %.0f записей/с' % (
+                    importer.read, importer.rate
+                )
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: %s; %.0f записей/с.' % (
+                ', '.join(
+                    '%s %d' % item for item in importer.created.items()
+                ),
+                importer.rate,
+            )
+        ))
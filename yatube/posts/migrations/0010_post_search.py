@@ -0,0 +1,61 @@
+from django.db import migrations
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    " text, group_title, group_description,"
+    " tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN"
+    " INSERT INTO posts_post_fts (rowid, text, group_title,"
+    " group_description)"
+    " SELECT new.id, new.text, g.title, g.description"
+    " FROM (SELECT 1) LEFT JOIN posts_group g ON g.id = new.group_id;"
+    " END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text, group_id"
+    " ON posts_post BEGIN"
+    " DELETE FROM posts_post_fts WHERE rowid = old.id;"
+    " INSERT INTO posts_post_fts (rowid, text, group_title,"
+    " group_description)"
+    " SELECT new.id, new.text, g.title, g.description"
+    " FROM (SELECT 1) LEFT JOIN posts_group g ON g.id = new.group_id;"
+    " END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN"
+    " DELETE FROM posts_post_fts WHERE rowid = old.id;"
+    " END",
+    "CREATE TRIGGER posts_group_fts_update AFTER UPDATE OF title, description"
+    " ON posts_group BEGIN"
+    " UPDATE posts_post_fts SET group_title = new.title,"
+    " group_description = new.description"
+    " WHERE rowid IN (SELECT id FROM posts_post WHERE group_id = new.id);"
+    " END",
+    "INSERT INTO posts_post_fts (rowid, text, group_title, group_description)"
+    " SELECT p.id, p.text, g.title, g.description"
+    " FROM posts_post p LEFT JOIN posts_group g ON g.id = p.group_id",
+)
+
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS posts_group_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TABLE IF EXISTS posts_post_fts',
+)
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,193 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import Q
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class CursorPage(Page):
+    """Страница CursorPaginator.
+
+    Номер страницы здесь — курсор: next_page_number() и
+    previous_page_number() возвращают курсоры соседних страниц для
+    get_page(), а позиции записей в общем списке неизвестны.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page of %s objects>' % len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        if self.next_cursor is None:
+            raise EmptyPage('That page contains no results')
+        return self.next_cursor
+
+    def previous_page_number(self):
+        if self.previous_cursor is None:
+            raise EmptyPage('That page number is less than 1')
+        return self.previous_cursor
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация без COUNT(*) и OFFSET.
+
+    Страница выбирается условием по значениям полей сортировки
+    последней показанной записи, поэтому любая страница стоит
+    столько же, сколько первая. Курсор — непрозрачная строка.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    # Общее число записей и страниц неизвестно: ради этого и не
+    # выполняется COUNT(*). Поля Paginator переопределены, чтобы шаблон
+    # или чужой код не запустили его неявно.
+    count = None
+    num_pages = None
+    page_range = ()
+
+    def validate_number(self, number):
+        """Номер страницы — курсор; неверный курсор ведёт на первую."""
+        return self.decode_cursor(number)
+
+    def page(self, cursor):
+        direction, values = self.validate_number(cursor)
+        rows = self.fetch(direction, values, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+        next_cursor = previous_cursor = None
+        if rows:
+            if direction == FORWARD and has_more or direction == BACKWARD:
+                next_cursor = self.encode_cursor(FORWARD, rows[-1])
+            if direction == BACKWARD and has_more or (
+                    direction == FORWARD and values is not None):
+                previous_cursor = self.encode_cursor(BACKWARD, rows[0])
+        return CursorPage(self.resolve(rows), self, next_cursor,
+                          previous_cursor)
+
+    def fetch(self, direction, values, limit):
+        return list(
+            self.keyset(self.object_list, direction, values)[:limit]
+        )
+
+    def resolve(self, rows):
+        return rows
+
+    def keyset(self, queryset, direction, values, fields=None):
+        """Сортирует queryset и отсекает записи до курсора.
+
+        fields позволяет применить курсор к другой модели, чьи поля
+        соответствуют полям сортировки paginator'а по порядку.
+        """
+        fields = fields or self.fields
+        ordering = self.ordering
+        if direction == BACKWARD:
+            ordering = self._reversed_ordering()
+        queryset = queryset.order_by(*(
+            ('-' if name.startswith('-') else '') + field
+            for name, field in zip(ordering, fields)
+        ))
+        if values is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(direction, values, fields))
+        return queryset
+
+    def get_page(self, cursor):
+        return self.page(cursor)
+
+    def dump_values(self, obj):
+        return [
+            self._get_field(name).value_to_string(obj) for name in self.fields
+        ]
+
+    def load_values(self, raw_values):
+        return [
+            self._get_field(name).to_python(value)
+            for name, value in zip(self.fields, raw_values)
+        ]
+
+    def encode_cursor(self, direction, obj):
+        payload = json.dumps(
+            [direction, self.dump_values(obj)], separators=(',', ':')
+        )
+        return base64.urlsafe_b64encode(
+            payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return FORWARD, None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, raw_values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()))
+            if direction not in (FORWARD, BACKWARD):
+                raise ValueError
+            if len(raw_values) != len(self.fields):
+                raise ValueError
+            values = self.load_values(raw_values)
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            return FORWARD, None
+        return direction, values
+
+    def _get_field(self, name):
+        opts = self.object_list.model._meta
+        if name == 'pk':
+            return opts.pk
+        return opts.get_field(name)
+
+    def _reversed_ordering(self):
+        return tuple(
+            name[1:] if name.startswith('-') else '-' + name
+            for name in self.ordering
+        )
+
+    def _keyset_filter(self, direction, values, fields):
+        """(a < x) OR (a = x AND b < y) ... с границей a <= x впереди.
+
+        Одну цепочку OR SQLite не превращает в диапазон индекса и
+        читает индекс с начала; граница по первому полю даёт поиск
+        по индексу, и глубокая страница стоит как первая.
+        """
+        condition = Q()
+        bound = None
+        for index, name in enumerate(self.ordering):
+            descending = name.startswith('-')
+            if direction == BACKWARD:
+                descending = not descending
+            if bound is None:
+                bound = Q(**{'%s__%s' % (
+                    fields[index], 'lte' if descending else 'gte'
+                ): values[index]})
+            lookup = '%s__%s' % (fields[index], 'lt' if descending else 'gt')
+            equal = {
+                field: value
+                for field, value in zip(fields[:index], values[:index])
+            }
+            condition |= Q(**equal, **{lookup: values[index]})
+        return bound & condition
@@ -0,0 +1,135 @@
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginator import BACKWARD, CursorPaginator
+
+TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 16
+# Веса bm25 для колонок text, group_title, group_description.
+WEIGHTS = (10.0, 5.0, 1.0)
+SNIPPET_TOKENS = 24
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SearchRow = namedtuple('SearchRow', ('score', 'id'))
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match(query):
+    """Превращает ввод пользователя в безопасный запрос FTS5.
+
+    Каждое слово экранируется кавычками и ищется по префиксу, слова
+    объединяются через AND; синтаксис FTS5 из ввода не используется.
+    """
+    terms = TERM_RE.findall(query)[:MAX_TERMS]
+    return ' '.join('"%s"*' % term for term in terms)
+
+
+def matching_ids_sql(match):
+    return RawSQL(
+        'SELECT rowid FROM posts_post_fts WHERE posts_post_fts MATCH %s',
+        (match,),
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Пагинатор результатов полнотекстового поиска.
+
+    Результаты упорядочены по релевантности bm25, курсор хранит пару
+    (score, id) последнего результата. Сниппеты строятся только для
+    записей текущей страницы.
+    """
+
+    def __init__(self, query, per_page):
+        super().__init__(
+            Post.objects.select_related('author', 'group'),
+            per_page,
+            ordering=('score', 'id'),
+        )
+        self.match = build_match(query)
+
+    def dump_values(self, obj):
+        return [obj.score, obj.id]
+
+    def load_values(self, raw_values):
+        score, post_id = raw_values
+        return [float(score), int(post_id)]
+
+    def fetch(self, direction, values, limit):
+        if not self.match:
+            return []
+        comparison, order = '>', 'ASC'
+        if direction == BACKWARD:
+            comparison, order = '<', 'DESC'
+        sql = (
+            'SELECT score, id FROM ('
+            ' SELECT bm25(posts_post_fts, %s, %s, %s) AS score, rowid AS id'
+            ' FROM posts_post_fts WHERE posts_post_fts MATCH %%s'
+            ')' % WEIGHTS
+        )
+        params = [self.match]
+        if values is not None:
+            sql += (
+                ' WHERE score {0} %s OR (score = %s AND id {0} %s)'
+                .format(comparison)
+            )
+            params += [values[0], values[0], values[1]]
+        sql += ' ORDER BY score {0}, id {0} LIMIT %s'.format(order)
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [SearchRow(*row) for row in cursor.fetchall()]
+
+    def resolve(self, rows):
+        if not rows:
+            return []
+        ids = [row.id for row in rows]
+        posts = self.object_list.in_bulk(ids)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid, snippet(posts_post_fts, -1, %%s, %%s, %%s, %d)'
+                ' FROM posts_post_fts WHERE posts_post_fts MATCH %%s'
+                ' AND rowid IN (%s)'
+                % (SNIPPET_TOKENS, ', '.join(['%s'] * len(ids))),
+                [MARK_START, MARK_END, '…', self.match] + ids,
+            )
+            snippets = dict(cursor.fetchall())
+        results = []
+        for row in rows:
+            post = posts.get(row.id)
+            if post is None:
+                continue
+            post.score = row.score
+            post.snippet = highlight(snippets.get(row.id) or post.text)
+            results.append(post)
+        return results
+
+
+def fallback_queryset(query):
+    """Поиск через LIKE для баз данных без FTS5."""
+    condition = Q()
+    for term in TERM_RE.findall(query)[:MAX_TERMS]:
+        condition &= (
+            Q(text__icontains=term)
+            | Q(group__title__icontains=term)
+            | Q(group__description__icontains=term)
+        )
+    return Post.objects.select_related('author', 'group').filter(condition)
@@ -0,0 +1,116 @@
+import random
+from bisect import bisect
+from datetime import timedelta
+from itertools import accumulate
+
+from django.utils import timezone
+from faker import Faker
+
+from .importer import Importer
+
+TEXT_POOL_SIZE = 2000
+NAME_POOL_SIZE = 500
+MAX_COMMENTS = 200
+MAX_FOLLOWS = 500
+
+
+class PowerLaw:
+    """Выбор индекса 0..n-1 с вероятностью, убывающей как 1 / rank**alpha.
+
+    Так распределены активность авторов, их популярность и обсуждаемость
+    постов в реальных соцсетях: немногие получают почти всё.
+    """
+
+    def __init__(self, n, alpha, rng):
+        self.rng = rng
+        self.cumulative = list(accumulate(
+            1 / rank ** alpha for rank in range(1, n + 1)
+        ))
+
+    def __call__(self):
+        point = self.rng.random() * self.cumulative[-1]
+        return bisect(self.cumulative, point)
+
+
+def heavy_tail(rng, alpha, limit):
+    """Целое число от 0 с тяжёлым хвостом (распределение Парето)."""
+    return min(int(rng.paretovariate(alpha)) - 1, limit)
+
+
+def generate_records(posts, users, groups, alpha=1.2, seed=0, days=365):
+    """Записи для posts.importer.Importer.
+
+    Авторы постов, цели подписок и число комментариев подчиняются
+    степенному закону. Тексты берутся из заранее созданного пула Faker,
+    поэтому генерация миллионов постов не упирается в Faker.
+    """
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    texts = [fake.text(max_nb_chars=400) for _ in range(TEXT_POOL_SIZE)]
+    comments = [fake.sentence() for _ in range(TEXT_POOL_SIZE)]
+    names = [
+        (fake.first_name(), fake.last_name()) for _ in range(NAME_POOL_SIZE)
+    ]
+    for user_id in range(users):
+        first_name, last_name = rng.choice(names)
+        yield {
+            'model': 'user',
+            'id': user_id,
+            'username': 'seed_user_%d' % user_id,
+            'first_name': first_name,
+            'last_name': last_name,
+        }
+    for group_id in range(groups):
+        yield {
+            'model': 'group',
+            'id': group_id,
+            'slug': 'seed-group-%d' % group_id,
+            'title': fake.catch_phrase()[:200],
+            'description': rng.choice(comments),
+        }
+    pick_author = PowerLaw(users, alpha, rng)
+    pick_group = PowerLaw(groups, alpha, rng) if groups else None
+    start = timezone.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(posts, 1)
+    for post_id in range(posts):
+        pub_date = start + step * post_id
+        record = {
+            'model': 'post',
+            'id': post_id,
+            'author': pick_author(),
+            'text': rng.choice(texts),
+            'pub_date': pub_date.isoformat(),
+        }
+        if pick_group is not None and rng.random() < 0.7:
+            record['group'] = pick_group()
+        yield record
+        for index in range(heavy_tail(rng, alpha, MAX_COMMENTS)):
+            yield {
+                'model': 'comment',
+                'post': post_id,
+                'author': rng.randrange(users),
+                'text': rng.choice(comments),
+                'created': (pub_date + timedelta(minutes=index)).isoformat(),
+            }
+    pick_followee = PowerLaw(users, alpha, rng)
+    for user_id in range(users):
+        for _ in range(heavy_tail(rng, alpha, MAX_FOLLOWS)):
+            yield {
+                'model': 'follow',
+                'user': user_id,
+                'author': pick_followee(),
+            }
+
+
+def seed(posts, users, groups, alpha=1.2, seed=0, batch_size=1000,
+         progress=None):
+    # Комментарии идут сразу за своим постом, поэтому помнить все
+    # id постов не нужно.
+    importer = Importer(batch_size=batch_size, posts_memory=batch_size)
+    for record in generate_records(posts, users, groups, alpha, seed):
+        importer.add(record)
+        if progress is not None and importer.read % 100000 == 0:
+            progress(importer)
+    importer.finish()
+    return importer
@@ -0,0 +1,38 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.cache import CARD_TIMEOUT, post_card_keys
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+@register.simple_tag
+def load_post_cards(posts, show_author=True, show_group=True):
+    """Кладёт в post.card карточку каждого поста, беря её из кэша.
+
+    Все фрагменты страницы читаются одним get_many, отрендеренные
+    заново — сохраняются одним set_many. Сам тег ничего не выводит,
+    карточки выводятся в цикле по странице: {{ post.card }}.
+    """
+    posts = list(posts)
+    variant = '%d%d' % (show_author, show_group)
+    keys = post_card_keys(posts, variant)
+    cached = cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = render_to_string(CARD_TEMPLATE, {
+                'post': post,
+                'show_author': show_author,
+                'show_group': show_group,
+            })
+            missing[key] = card
+        post.card = mark_safe(card)
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+    return ''
@@ -14,6 +14,7 @@ POST_DETAIL_URL_NAME = 'posts:post_detail'
 POST_EDIT_URL_NAME = 'posts:post_edit'
 POST_CREATE_URL_NAME = 'posts:post_create'
 POST_DETAIL_COMMENT_URL_NAME = 'posts:add_comment'
+POST_COMMENTS_URL_NAME = 'posts:post_comments'
 POST_FOLLOW_URL_NAME = 'posts:follow_index'
 
 INDEX_TEMPLATE = 'posts/index.html'
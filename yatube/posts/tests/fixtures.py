@@ -0,0 +1,19 @@
+from posts.models import Comment, Follow, Post, User
+from posts.tests.constants import COMMENT_TEXT, POST_TEXT
+
+
+def create_feed(user, group, authors_count, posts_per_author):
+    """Авторы author0..N, на которых подписан user, с постами в group.
+
+    Под каждым постом — комментарий user. Возвращает последний пост.
+    """
+    post = None
+    for index in range(authors_count):
+        author = User.objects.create_user(username=f'author{index}')
+        Follow.objects.create(user=user, author=author)
+        for _ in range(posts_per_author):
+            post = Post.objects.create(
+                author=author, group=group, text=POST_TEXT
+            )
+            Comment.objects.create(post=post, author=user, text=COMMENT_TEXT)
+    return post
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.tests.constants import (
+    GROUP_DESCRIPTION,
+    GROUP_LIST_URL_NAME,
+    GROUP_SLUG,
+    GROUP_TITLE,
+    POST_EDIT_TEXT,
+    POST_TEXT,
+    PROFILE_URL_NAME,
+    USER_USERNAME,
+)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text=POST_TEXT,
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.profile_url = reverse(
+            PROFILE_URL_NAME, kwargs={'username': self.author.username}
+        )
+        cache.clear()
+
+    def test_card_served_from_cache(self):
+        """Карточка поста берётся из кэша фрагментов."""
+        self.guest_client.get(self.profile_url)
+        Post.objects.filter(pk=self.post.pk).update(text=POST_EDIT_TEXT)
+        response = self.guest_client.get(self.profile_url)
+        self.assertContains(response, POST_TEXT)
+        self.assertNotContains(response, POST_EDIT_TEXT)
+
+    def test_post_save_invalidates_card(self):
+        """Сохранение поста сбрасывает его карточку."""
+        self.guest_client.get(self.profile_url)
+        self.post.text = POST_EDIT_TEXT
+        self.post.save()
+        response = self.guest_client.get(self.profile_url)
+        self.assertContains(response, POST_EDIT_TEXT)
+
+    def test_group_and_author_save_invalidate_card(self):
+        """Изменение группы или автора сбрасывает карточки их постов."""
+        group_url = reverse(
+            GROUP_LIST_URL_NAME, kwargs={'slug': self.group.slug}
+        )
+        self.guest_client.get(group_url)
+        self.guest_client.get(self.profile_url)
+        self.author.first_name = 'Лев'
+        self.author.save()
+        self.assertContains(self.guest_client.get(group_url), 'Лев')
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.assertContains(
+            self.guest_client.get(self.profile_url), '/group/new-slug/'
+        )
@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from posts.tests.constants import (
+    AUTHOR_USERNAME,
+    COMMENT_TEXT,
+    POST_COMMENTS_URL_NAME,
+    POST_DETAIL_URL_NAME,
+    POST_TEXT,
+    USER_USERNAME,
+)
+from posts.views import COMMENTS_QUANTITY
+
+COMMENTS_COUNT = COMMENTS_QUANTITY + 5
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.post = Post.objects.create(author=cls.author, text=POST_TEXT)
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(
+                    username='%s%d' % (USER_USERNAME, index)
+                ),
+                text='%s %d' % (COMMENT_TEXT, index),
+            )
+            for index in range(COMMENTS_COUNT)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_first_page(self):
+        """На странице поста только первая порция новых комментариев."""
+        response = self.client.get(
+            reverse(POST_DETAIL_URL_NAME, args=(self.post.id,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_QUANTITY)
+        self.assertEqual(comments[0], self.comments[-1])
+        self.assertTrue(comments.has_next())
+
+    def test_fragment_returns_next_batch(self):
+        """Фрагмент по курсору отдаёт оставшиеся комментарии."""
+        response = self.client.get(
+            reverse(POST_DETAIL_URL_NAME, args=(self.post.id,))
+        )
+        cursor = response.context['comments'].next_cursor
+        response = self.client.get(
+            reverse(POST_COMMENTS_URL_NAME, args=(self.post.id,)),
+            {'cursor': cursor},
+        )
+        comments = response.context['comments']
+        rest = self.comments[:COMMENTS_COUNT - COMMENTS_QUANTITY]
+        self.assertEqual(list(comments), rest[::-1])
+        self.assertFalse(comments.has_next())
+        self.assertNotContains(response, '<html')
+
+    def test_initial_render_query_count(self):
+        """Число запросов не зависит от количества комментариев."""
+        url = reverse(POST_DETAIL_URL_NAME, args=(self.post.id,))
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text=COMMENT_TEXT)
+            for _ in range(COMMENTS_QUANTITY)
+        )
+        cache.clear()
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_unknown_post(self):
+        """Фрагмент несуществующего поста отвечает 404."""
+        response = self.client.get(
+            reverse(POST_COMMENTS_URL_NAME, args=(self.post.id + 1,))
+        )
+        self.assertEqual(response.status_code, 404)
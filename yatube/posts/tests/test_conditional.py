@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.tests.constants import (
+    AUTHOR_USERNAME,
+    COMMENT_TEXT,
+    GROUP_DESCRIPTION,
+    GROUP_LIST_URL_NAME,
+    GROUP_SLUG,
+    GROUP_TITLE,
+    POST_DETAIL_URL_NAME,
+    POST_EDIT_TEXT,
+    POST_TEXT,
+    PROFILE_URL_NAME,
+    USER_USERNAME,
+)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text=POST_TEXT
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def etag(self, url, client=None):
+        response = (client or self.guest_client).get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('W/'))
+        return response['ETag']
+
+    def test_not_modified(self):
+        """Повторный запрос с тем же ETag получает 304."""
+        urls = (
+            reverse(POST_DETAIL_URL_NAME, args=(self.post.id,)),
+            reverse(PROFILE_URL_NAME, args=(AUTHOR_USERNAME,)),
+            reverse(GROUP_LIST_URL_NAME, args=(GROUP_SLUG,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.user_client.get(
+                    url, HTTP_IF_NONE_MATCH=self.etag(url, self.user_client)
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_skips_view(self):
+        """304 для группы стоит одного запроса к БД."""
+        url = reverse(GROUP_LIST_URL_NAME, args=(GROUP_SLUG,))
+        etag = self.etag(url)
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_depends_on_user(self):
+        """Гость и авторизованный пользователь получают разные ETag."""
+        url = reverse(POST_DETAIL_URL_NAME, args=(self.post.id,))
+        self.assertNotEqual(self.etag(url), self.etag(url, self.user_client))
+
+    def test_post_detail_etag_changes(self):
+        """Правка поста и новый комментарий меняют ETag."""
+        url = reverse(POST_DETAIL_URL_NAME, args=(self.post.id,))
+        first = self.etag(url)
+        self.post.text = POST_EDIT_TEXT
+        self.post.save()
+        second = self.etag(url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text=COMMENT_TEXT
+        )
+        third = self.etag(url)
+        self.assertEqual(len({first, second, third}), 3)
+
+    def test_profile_etag_changes_on_follow(self):
+        """Подписка меняет ETag профиля для подписчика."""
+        url = reverse(PROFILE_URL_NAME, args=(AUTHOR_USERNAME,))
+        before = self.etag(url, self.user_client)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertNotEqual(before, self.etag(url, self.user_client))
+
+    def test_missing_objects(self):
+        """Несуществующие пост, автор и группа по-прежнему дают 404."""
+        urls = (
+            reverse(POST_DETAIL_URL_NAME, args=(self.post.id + 100,)),
+            reverse(PROFILE_URL_NAME, args=('missing',)),
+            reverse(GROUP_LIST_URL_NAME, args=('missing',)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User, UserStats
+from posts.tests.constants import (
+    AUTHOR_USERNAME,
+    COMMENT_TEXT,
+    POST_CREATE_URL_NAME,
+    POST_DETAIL_COMMENT_URL_NAME,
+    POST_TEXT,
+    USER_USERNAME,
+)
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_posts_and_comments_counters(self):
+        """Создание постов и комментариев увеличивает счётчики."""
+        self.author_client.post(
+            reverse(POST_CREATE_URL_NAME), data={'text': POST_TEXT}
+        )
+        post = Post.objects.get(author=self.author)
+        self.user_client.post(
+            reverse(POST_DETAIL_COMMENT_URL_NAME, args=(post.id,)),
+            data={'text': COMMENT_TEXT},
+        )
+        post.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        post.comments.get().delete()
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики подписчиков и подписок."""
+        self.user_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        self.user_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_rebuild_counters_fixes_drift(self):
+        """rebuild_counters пересчитывает счётчики по данным."""
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        UserStats.objects.filter(user=self.user).delete()
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.user).posts_count, 0)
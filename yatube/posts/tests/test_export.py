@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import export
+from posts.models import Comment, Group, Post, User
+from posts.tests.constants import (
+    AUTHOR_USERNAME,
+    COMMENT_TEXT,
+    GROUP_DESCRIPTION,
+    GROUP_SLUG,
+    GROUP_TITLE,
+    POST_TEXT,
+    USER_USERNAME,
+)
+
+GROUP_EXPORT_URL_NAME = 'posts:group_export'
+PROFILE_EXPORT_URL_NAME = 'posts:profile_export'
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=POST_TEXT
+            )
+            for _ in range(5)
+        ]
+        Post.objects.create(author=cls.user, text=POST_TEXT)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text=COMMENT_TEXT
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_iter_rows_uses_chunks(self):
+        """Строки читаются пачками и не теряются на границах пачек."""
+        rows = list(export.iter_rows(
+            Post.objects.filter(author=self.author), ('id',), chunk_size=2
+        ))
+        self.assertEqual(
+            [post_id for post_id, in rows],
+            [post.id for post in self.posts],
+        )
+
+    def test_group_export_ndjson(self):
+        """Выгрузка группы отдаёт по строке JSON на пост."""
+        response = self.client.get(
+            reverse(GROUP_EXPORT_URL_NAME, args=(GROUP_SLUG,))
+        )
+        self.assertTrue(response.streaming)
+        lines = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(lines), len(self.posts))
+        self.assertEqual(lines[0]['author'], AUTHOR_USERNAME)
+        self.assertEqual(lines[0]['group'], GROUP_SLUG)
+        self.assertEqual(lines[0]['comments_count'], 1)
+
+    def test_profile_export_comments_csv(self):
+        """Выгрузка комментариев к постам автора в CSV."""
+        response = self.client.get(
+            reverse(PROFILE_EXPORT_URL_NAME, args=(AUTHOR_USERNAME,)),
+            {'data': 'comments', 'format': 'csv'},
+        )
+        self.assertEqual(response['Content-Type'], export.FORMATS['csv'])
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], 'id,post,author,text,created')
+        self.assertEqual(len(lines), 2)
+        self.assertIn(COMMENT_TEXT, lines[1])
+
+    def test_export_requires_login(self):
+        """Аноним перенаправляется на страницу входа."""
+        response = Client().get(
+            reverse(GROUP_EXPORT_URL_NAME, args=(GROUP_SLUG,))
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_unknown_format(self):
+        """Неизвестный формат выгрузки возвращает 404."""
+        response = self.client.get(
+            reverse(GROUP_EXPORT_URL_NAME, args=(GROUP_SLUG,)),
+            {'format': 'xml'},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_export_command(self):
+        """Команда записывает выгрузку автора в файл."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'posts.ndjson')
+        call_command(
+            'export_yatube', author=AUTHOR_USERNAME, output=path,
+            stdout=StringIO(),
+        )
+        with open(path, encoding='utf-8') as stream:
+            self.assertEqual(len(stream.readlines()), len(self.posts))
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.tests.constants import (
+    AUTHOR_USERNAME,
+    GROUP_DESCRIPTION,
+    GROUP_SLUG,
+    GROUP_TITLE,
+    POST_EDIT_TEXT,
+    POST_TEXT,
+)
+
+INDEX_RSS_URL_NAME = 'posts:index_rss'
+INDEX_ATOM_URL_NAME = 'posts:index_atom'
+GROUP_RSS_URL_NAME = 'posts:group_rss'
+PROFILE_ATOM_URL_NAME = 'posts:profile_atom'
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text=POST_TEXT
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_contain_posts(self):
+        """Ленты RSS и Atom содержат посты своей выборки."""
+        urls = {
+            reverse(INDEX_RSS_URL_NAME): 'application/rss+xml',
+            reverse(INDEX_ATOM_URL_NAME): 'application/atom+xml',
+            reverse(GROUP_RSS_URL_NAME, args=(GROUP_SLUG,)):
+                'application/rss+xml',
+            reverse(PROFILE_ATOM_URL_NAME, args=(AUTHOR_USERNAME,)):
+                'application/atom+xml',
+        }
+        for url, content_type in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type
+                ))
+                self.assertContains(response, POST_TEXT)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_not_modified_without_rendering(self):
+        """Повторный опрос отвечает 304 одним запросом к БД."""
+        url = reverse(GROUP_RSS_URL_NAME, args=(GROUP_SLUG,))
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_on_new_and_edited_posts(self):
+        """Новый пост и правка старого меняют ETag ленты."""
+        url = reverse(INDEX_RSS_URL_NAME)
+        first = self.client.get(url)['ETag']
+        self.post.text = POST_EDIT_TEXT
+        self.post.save()
+        second = self.client.get(url)['ETag']
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        third = self.client.get(url)['ETag']
+        self.assertEqual(len({first, second, third}), 3)
+
+    def test_deleted_post_changes_etag(self):
+        """Удаление поста меняет ETag, даже если он не самый новый."""
+        url = reverse(INDEX_RSS_URL_NAME)
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        etag = self.client.get(url)['ETag']
+        self.post.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unknown_group(self):
+        """Лента несуществующей группы отвечает 404."""
+        response = self.client.get(
+            reverse(GROUP_RSS_URL_NAME, args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
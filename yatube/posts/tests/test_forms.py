@@ -2,12 +2,18 @@ import shutil
 import tempfile
 
 from http import HTTPStatus
+from io import BytesIO
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts.forms import PostForm
 from posts.models import Group, Post, User
 from posts.tests.constants import (
     GROUP_DESCRIPTION,
@@ -23,6 +29,12 @@ from posts.tests.constants import (
 )
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+THUMBNAIL_TEMPLATE = (
+    '{% load thumbnail %}'
+    '{% thumbnail name "960x339" crop="center" upscale=True as im %}'
+    '{{ im.name }}'
+    '{% endthumbnail %}'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -104,3 +116,67 @@ class PostFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count)
         self.assertTrue(Post.objects.filter(text=POST_EDIT_TEXT).exists())
         self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+def make_image(image_format, size, mode='RGB', color='white',
+               **save_options):
+    output = BytesIO()
+    Image.new(mode, size, color).save(output, image_format, **save_options)
+    return output.getvalue()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_IMAGE_MAX_SIDE=100,
+    POST_IMAGE_MAX_PIXELS=1000 * 1000,
+)
+class PostImageFormTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def form(self, name, content):
+        return PostForm(
+            data={'text': POST_TEXT},
+            files={'image': SimpleUploadedFile(name, content)},
+        )
+
+    def test_image_downscaled_and_metadata_stripped(self):
+        """Изображение уменьшается, метаданные удаляются."""
+        exif = Image.Exif()
+        exif[0x010E] = 'secret description'
+        form = self.form(
+            'photo.jpg', make_image('JPEG', (400, 200), exif=exif.tobytes())
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        image = form.cleaned_data['image']
+        self.assertEqual(image.name, 'photo.jpg')
+        normalized = Image.open(image)
+        self.assertEqual(normalized.size, (100, 50))
+        self.assertNotIn('exif', normalized.info)
+
+    def test_too_many_pixels_rejected(self):
+        """Изображение с слишком большим числом пикселей отклоняется."""
+        form = self.form('huge.png', make_image('PNG', (2000, 1000)))
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def render_thumbnail(self, name, content):
+        form = self.form(name, content)
+        self.assertTrue(form.is_valid(), form.errors)
+        image = form.cleaned_data['image']
+        name = default_storage.save('posts/' + image.name, image)
+        thumbnail = Template(THUMBNAIL_TEMPLATE).render(
+            Context({'name': name})
+        )
+        with default_storage.open(thumbnail) as thumbnail_file:
+            return Image.open(thumbnail_file).mode
+
+    def test_transparent_images_render_thumbnails(self):
+        """Прозрачные GIF и PNG после нормализации дают миниатюры."""
+        cache.clear()
+        gif = make_image('GIF', (40, 20), mode='L', color=1, transparency=1)
+        png = make_image('PNG', (40, 20), mode='RGBA', color=(255, 0, 0, 0))
+        self.assertEqual(self.render_thumbnail('clear.gif', gif), 'RGB')
+        self.assertEqual(self.render_thumbnail('clear.png', png), 'RGB')
@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.importer import Importer
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.tests.constants import (
+    AUTHOR_USERNAME,
+    COMMENT_TEXT,
+    GROUP_DESCRIPTION,
+    GROUP_SLUG,
+    GROUP_TITLE,
+    POST_TEXT,
+    USER_USERNAME,
+)
+
+RECORDS = [
+    {'model': 'user', 'id': 1, 'username': AUTHOR_USERNAME},
+    {'model': 'user', 'id': 2, 'username': USER_USERNAME},
+    {
+        'model': 'group', 'id': 7, 'slug': GROUP_SLUG,
+        'title': GROUP_TITLE, 'description': GROUP_DESCRIPTION,
+    },
+    {
+        'model': 'post', 'id': 10, 'author': 1, 'group': 7,
+        'text': POST_TEXT, 'pub_date': '2020-01-02T03:04:05',
+    },
+    {
+        'model': 'comment', 'post': 10, 'author': 2,
+        'text': COMMENT_TEXT, 'created': '2020-01-03T00:00:00',
+    },
+    {'model': 'follow', 'user': 2, 'author': 1},
+    {'model': 'follow', 'user': 2, 'author': 1},
+    {'model': 'post', 'id': 11, 'author': 99, 'text': POST_TEXT},
+]
+CSV_DATA = (
+    'model,id,username,author,text,pub_date\n'
+    'user,1,%s,,,\n'
+    'post,5,,1,%s,2021-05-06T07:08:09\n'
+) % (AUTHOR_USERNAME, POST_TEXT)
+
+
+class ImportYatubeTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.write(data)
+        return path
+
+    def import_file(self, path, **options):
+        call_command('import_yatube', path, stdout=StringIO(), **options)
+
+    def test_import_jsonl(self):
+        """Импорт JSONL создаёт объекты и сохраняет связи и даты."""
+        path = self.write(
+            'data.jsonl', '\n'.join(map(json.dumps, RECORDS))
+        )
+        self.import_file(path, batch_size=2)
+        author = User.objects.get(username=AUTHOR_USERNAME)
+        user = User.objects.get(username=USER_USERNAME)
+        post = Post.objects.get()
+        self.assertEqual(post.author, author)
+        self.assertEqual(post.group, Group.objects.get(slug=GROUP_SLUG))
+        self.assertEqual(
+            post.pub_date, datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        )
+        comment = Comment.objects.get()
+        self.assertEqual((comment.post, comment.author), (post, user))
+        self.assertEqual(
+            comment.created, datetime(2020, 1, 3, tzinfo=timezone.utc)
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(author.stats.followers_count, 1)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=user, post=post).exists()
+        )
+
+    def test_existing_users_are_reused(self):
+        """Повторный импорт не создаёт пользователей и группы заново."""
+        path = self.write(
+            'data.jsonl', '\n'.join(map(json.dumps, RECORDS))
+        )
+        self.import_file(path)
+        self.import_file(path)
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_import_csv(self):
+        """Импорт CSV определяет формат по расширению файла."""
+        self.import_file(self.write('data.csv', CSV_DATA))
+        post = Post.objects.get()
+        self.assertEqual(post.author.username, AUTHOR_USERNAME)
+        self.assertEqual(post.pub_date.year, 2021)
+
+    def test_invalid_date(self):
+        """Некорректная дата прерывает импорт с понятной ошибкой."""
+        path = self.write('data.jsonl', '\n'.join(map(json.dumps, [
+            RECORDS[0], dict(RECORDS[3], group=None, pub_date='вчера'),
+        ])))
+        with self.assertRaises(CommandError):
+            self.import_file(path)
+
+    def test_import_keeps_auto_now_add(self):
+        """Импорт не отключает auto_now_add для остальных сохранений."""
+        path = self.write(
+            'data.jsonl', '\n'.join(map(json.dumps, RECORDS))
+        )
+        self.import_file(path)
+        post = Post.objects.create(
+            author=User.objects.get(username=AUTHOR_USERNAME),
+            text=POST_TEXT,
+        )
+        self.assertGreater(post.pub_date.year, 2020)
+
+    def test_posts_memory_limits_comment_lookup(self):
+        """Комментарий к забытому посту пропускается."""
+        records = RECORDS[:4] + [
+            dict(RECORDS[3], id=12), RECORDS[4],
+        ]
+        path = self.write(
+            'data.jsonl', '\n'.join(map(json.dumps, records))
+        )
+        self.import_file(path, batch_size=1, posts_memory=1)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_skipped_counted_once(self):
+        """Неверная, повторная и существующая подписки пропущены по разу."""
+        importer = Importer()
+        for record in RECORDS + [
+            {'model': 'follow', 'user': 2, 'author': 99},
+        ]:
+            importer.add(record)
+        importer.flush()
+        self.assertEqual(importer.skipped, 3)
+        importer.add({'model': 'follow', 'user': 2, 'author': 1})
+        importer.finish()
+        self.assertEqual(importer.skipped, 4)
+        self.assertEqual(importer.created['follow'], 1)
@@ -0,0 +1,114 @@
+from io import StringIO
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from posts.loadtest import (
+    BUCKETS, LoadTest, WSGITransport, histogram, parse_mix,
+)
+from posts.models import Comment, Follow, Post
+from posts.seed import seed
+
+HOST = 'testserver'
+
+
+class LoadTestHelpersTests(SimpleTestCase):
+    def test_parse_mix(self):
+        """Веса view разбираются, неизвестные view отклоняются."""
+        self.assertEqual(
+            parse_mix('index=3,profile'), {'index': 3.0, 'profile': 1.0}
+        )
+        with self.assertRaises(ValueError):
+            parse_mix('unknown=1')
+
+    def test_histogram(self):
+        """Задержки попадают в корзину с ближайшей верхней границей."""
+        counts = dict(histogram([0.5, 1, 3, 10 ** 6]))
+        self.assertEqual(counts[1], 2)
+        self.assertEqual(counts[5], 1)
+        self.assertEqual(counts[None], 1)
+        self.assertEqual(len(counts), len(BUCKETS) + 1)
+
+
+class LoadTestRunTests(TransactionTestCase):
+    # Потоки нагрузки ходят в БД своими соединениями, поэтому данные
+    # должны быть закоммичены: TestCase здесь не подходит.
+
+    def setUp(self):
+        seed(50, 10, 2)
+
+    def run_load(self, mix, **options):
+        return LoadTest(
+            WSGITransport(WSGIHandler(), HOST), mix, **options
+        ).run()
+
+    def test_anonymous_reads(self):
+        """Анонимная нагрузка проходит без ошибок и считает RPS."""
+        result = self.run_load(
+            {'index': 1, 'group_list': 1, 'post_detail': 1},
+            concurrency=3, logged_in=0, requests=30,
+        )
+        self.assertEqual(result['requests'], 30)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['rps'], 0)
+        self.assertEqual(
+            sum(count for _, count in result['histogram']), 30
+        )
+
+    def test_login_required_views_only_for_sessions(self):
+        """Анонимы не ходят в follow_index, пользователи с сессией — ходят."""
+        result = self.run_load(
+            {'index': 1, 'follow_index': 1},
+            concurrency=2, logged_in=0.5, requests=40,
+        )
+        follow_index = result['views']['follow_index']
+        self.assertGreater(follow_index['requests'], 0)
+        self.assertEqual(
+            follow_index['statuses'], {'200': follow_index['requests']}
+        )
+
+    def test_post_with_csrf(self):
+        """POST проходит проверку CSRF и создаёт комментарии."""
+        comments = Comment.objects.count()
+        result = self.run_load(
+            {'add_comment': 1}, concurrency=1, logged_in=1, requests=3,
+        )
+        self.assertEqual(result['statuses'], {'302': 3})
+        self.assertEqual(Comment.objects.count(), comments + 3)
+
+    def test_write_and_export_views(self):
+        """Создание и правка постов, подписки и выгрузки проходят CSRF."""
+        posts = Post.objects.count()
+        result = self.run_load(
+            {
+                'post_create': 1, 'post_edit': 1, 'profile_follow': 1,
+                'profile_unfollow': 1, 'group_export': 1,
+                'profile_export': 1,
+            },
+            concurrency=1, logged_in=1, requests=60,
+        )
+        self.assertEqual(result['errors'], 0)
+        views = result['views']
+        self.assertEqual(
+            views['post_create']['statuses'],
+            {'302': views['post_create']['requests']},
+        )
+        self.assertEqual(
+            Post.objects.count(), posts + views['post_create']['requests']
+        )
+        self.assertEqual(
+            views['group_export']['statuses'],
+            {'200': views['group_export']['requests']},
+        )
+        self.assertIn('302', views['profile_follow']['statuses'])
+        self.assertTrue(Follow.objects.exists())
+
+    def test_loadtest_command_server_mode(self):
+        """Команда в режиме server печатает отчёт с гистограммой."""
+        stdout = StringIO()
+        call_command(
+            'loadtest', mode='server', host=HOST, requests=10,
+            concurrency=2, mix='index=1,post_detail=1', stdout=stdout,
+        )
+        self.assertIn('Гистограмма', stdout.getvalue())
@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Group, User
+from posts.tests.fixtures import create_feed
+from posts.tests.constants import (
+    COMMENT_TEXT,
+    GROUP_DESCRIPTION,
+    GROUP_LIST_URL_NAME,
+    GROUP_SLUG,
+    GROUP_TITLE,
+    INDEX_URL_NAME,
+    POST_DETAIL_URL_NAME,
+    POST_FOLLOW_URL_NAME,
+    PROFILE_URL_NAME,
+    USER_USERNAME,
+)
+
+AUTHORS_COUNT = 5
+POSTS_PER_AUTHOR = 3
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.post = create_feed(
+            cls.user, cls.group, AUTHORS_COUNT, POSTS_PER_AUTHOR
+        )
+        for index in range(AUTHORS_COUNT):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.get(username=f'author{index}'),
+                text=COMMENT_TEXT,
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_listing_views_within_budget(self):
+        """Страницы укладываются в бюджет запросов и не содержат N+1."""
+        pages = (
+            (INDEX_URL_NAME, ()),
+            (GROUP_LIST_URL_NAME, (self.group.slug,)),
+            (PROFILE_URL_NAME, (self.post.author.username,)),
+            (POST_DETAIL_URL_NAME, (self.post.id,)),
+            (POST_FOLLOW_URL_NAME, ()),
+        )
+        for view_name, args in pages:
+            for client in (self.guest_client, self.authorized_client):
+                if view_name == POST_FOLLOW_URL_NAME and (
+                        client is self.guest_client):
+                    continue
+                with self.subTest(view_name=view_name, client=client):
+                    cache.clear()
+                    with self.assertQueryBudget(view_name):
+                        client.get(reverse(view_name, args=args))
@@ -0,0 +1,162 @@
+import re
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, User
+from posts.tests.constants import (
+    COMMENT_TEXT,
+    GROUP_DESCRIPTION,
+    GROUP_LIST_URL_NAME,
+    GROUP_SLUG,
+    GROUP_TITLE,
+    INDEX_URL_NAME,
+    POST_COMMENTS_URL_NAME,
+    POST_DETAIL_URL_NAME,
+    POST_FOLLOW_URL_NAME,
+    PROFILE_URL_NAME,
+    USER_USERNAME,
+)
+from posts.tests.fixtures import create_feed
+
+AUTHORS_COUNT = 4
+POSTS_PER_AUTHOR = 25
+COMMENTS_COUNT = 25
+# Полный проход по таблице допустим только для FTS5.
+FULL_SCAN_RE = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+# Проход по индексу без условия в скобках читает его целиком; допустим
+# только для первых N строк всей таблицы (ORDER BY ... LIMIT без WHERE).
+INDEX_SCAN_RE = re.compile(
+    r'^SCAN (TABLE )?\w+( AS \w+)? USING (COVERING )?INDEX \w+$'
+)
+TOP_ROWS_RE = re.compile(r'ORDER BY [^()]+ LIMIT \d+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite')
+class QueryPlanTests(TestCase):
+    """Запросы страниц используют индексы, а не полный скан и сортировку."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.post = create_feed(
+            cls.user, cls.group, AUTHORS_COUNT, POSTS_PER_AUTHOR
+        )
+        # Комментариев под постом больше страницы, чтобы была вторая.
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=COMMENT_TEXT)
+            for _ in range(COMMENTS_COUNT)
+        )
+        # ANALYZE на игрушечных данных сбивает планировщик (группа из
+        # одной строки), поэтому проверяются планы по умолчанию.
+        cls.author = cls.post.author
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def plan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def problems(self, url):
+        # Запросы нужны с параметрами отдельно: с подставленными
+        # литералами SQLite строит другой план, чем в работе.
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            self.assertLess(self.client.get(url).status_code, 400)
+        problems = []
+        for sql, params in queries:
+            if not sql.startswith('SELECT'):
+                continue
+            top_rows = ' WHERE ' not in sql and TOP_ROWS_RE.search(sql)
+            for detail in self.plan(sql, params):
+                if (FULL_SCAN_RE.match(detail) or TEMP_SORT in detail
+                        or INDEX_SCAN_RE.match(detail) and not top_rows):
+                    problems.append('%s\n    %s' % (detail, sql))
+        return problems
+
+    def cursor(self, url, key='page_obj'):
+        """Курсор следующей страницы для url."""
+        cache.clear()
+        cursor = self.client.get(url).context[key].next_cursor
+        self.assertIsNotNone(cursor, url)
+        return cursor
+
+    def api_next(self, url, key='next'):
+        """Ссылка API на следующую страницу."""
+        next_url = self.client.get(url).json()[key]
+        self.assertIsNotNone(next_url, url)
+        return next_url
+
+    def assertUseIndexes(self, urls):
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                problems = self.problems(url)
+                self.assertEqual(problems, [], '\n'.join(problems))
+
+    def test_views_use_indexes(self):
+        """Ни один запрос страниц не сканирует таблицу и не сортирует."""
+        self.assertUseIndexes((
+            reverse(INDEX_URL_NAME),
+            reverse(GROUP_LIST_URL_NAME, args=(self.group.slug,)),
+            reverse(PROFILE_URL_NAME, args=(self.author.username,)),
+            reverse(POST_DETAIL_URL_NAME, args=(self.post.id,)),
+            reverse(POST_COMMENTS_URL_NAME, args=(self.post.id,)),
+            reverse(POST_FOLLOW_URL_NAME),
+            reverse('posts:index_rss'),
+            reverse('posts:group_atom', args=(self.group.slug,)),
+            reverse('posts:profile_rss', args=(self.author.username,)),
+            reverse('api:post_list'),
+            reverse('api:group_posts', args=(self.group.slug,)),
+            reverse('api:profile_posts', args=(self.author.username,)),
+            reverse('api:post_detail', args=(self.post.id,)),
+            reverse('api:follow_feed'),
+        ))
+
+    def test_next_pages_use_indexes(self):
+        """Страницы по курсору тоже ищут по индексу."""
+        pages = [
+            '%s?cursor=%s' % (url, self.cursor(url)) for url in (
+                reverse(INDEX_URL_NAME),
+                reverse(GROUP_LIST_URL_NAME, args=(self.group.slug,)),
+                reverse(PROFILE_URL_NAME, args=(self.author.username,)),
+                reverse(POST_FOLLOW_URL_NAME),
+            )
+        ]
+        detail = reverse(POST_DETAIL_URL_NAME, args=(self.post.id,))
+        comments = reverse(POST_COMMENTS_URL_NAME, args=(self.post.id,))
+        pages.append('%s?comments=%s' % (
+            detail, self.cursor(detail, 'comments')
+        ))
+        pages.append('%s?cursor=%s' % (
+            comments, self.cursor(comments, 'comments')
+        ))
+        pages.extend(self.api_next(url) for url in (
+            reverse('api:post_list'),
+            reverse('api:group_posts', args=(self.group.slug,)),
+            reverse('api:profile_posts', args=(self.author.username,)),
+            reverse('api:follow_feed'),
+        ))
+        pages.append(self.api_next(
+            reverse('api:post_detail', args=(self.post.id,)), 'comments_next'
+        ))
+        self.assertUseIndexes(pages)
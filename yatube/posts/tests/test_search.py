@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User as AdminUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Group, Post, User
+from posts.tests.constants import (
+    GROUP_DESCRIPTION,
+    GROUP_SLUG,
+    GROUP_TITLE,
+    USER_USERNAME,
+)
+
+SEARCH_URL_NAME = 'posts:search'
+
+
+class SearchTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESCRIPTION,
+        )
+        cls.tolstoy = Post.objects.create(
+            author=cls.author,
+            text='Толстой написал роман «Война и мир»',
+        )
+        cls.dostoevsky = Post.objects.create(
+            author=cls.author,
+            group=cls.group,
+            text='Достоевский и <script>alert(1)</script>',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def search(self, query, **params):
+        return self.guest_client.get(
+            reverse(SEARCH_URL_NAME), {'q': query, **params}
+        )
+
+    def test_search_finds_by_text_and_prefix(self):
+        """Поиск находит посты по словам и префиксам слов."""
+        response = self.search('толст')
+        self.assertEqual(list(response.context['page_obj']), [self.tolstoy])
+        self.assertContains(response, '<mark>Толстой</mark>')
+
+    def test_search_by_group_and_trigger_sync(self):
+        """Индекс следит за изменениями постов и групп."""
+        response = self.search('Тестовая')
+        self.assertEqual(
+            list(response.context['page_obj']), [self.dostoevsky]
+        )
+        Group.objects.filter(pk=self.group.pk).update(title='Классика')
+        Post.objects.filter(pk=self.tolstoy.pk).update(group=self.group)
+        response = self.search('классика')
+        self.assertEqual(
+            set(response.context['page_obj']),
+            {self.tolstoy, self.dostoevsky},
+        )
+
+    def test_snippet_is_escaped(self):
+        """HTML из текста поста экранируется в сниппете."""
+        response = self.search('Достоевский')
+        self.assertNotContains(response, '<script>')
+        self.assertContains(response, '&lt;script&gt;')
+
+    def test_search_pages_by_cursor(self):
+        """Результаты поиска разбиваются на страницы курсором."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'роман номер {index}')
+            for index in range(12)
+        )
+        first_page = self.search('роман').context['page_obj']
+        second_page = self.search(
+            'роман', cursor=first_page.next_cursor
+        ).context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(set(first_page) & set(second_page))
+
+    def test_search_within_budget_and_bad_syntax(self):
+        """Поиск укладывается в бюджет и не падает на спецсимволах."""
+        with self.assertQueryBudget(SEARCH_URL_NAME):
+            response = self.search('"роман* AND OR (')
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты через полнотекстовый индекс."""
+        admin = AdminUser.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'толстой'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.tolstoy]
+        )
@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.benchmark import PERCENTILES, VIEWS, percentile, run_benchmark
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.seed import generate_records, seed
+
+POSTS = 200
+USERS = 20
+GROUPS = 3
+
+
+class SeedTests(TestCase):
+    def test_generate_records_is_reproducible(self):
+        """Одинаковое зерно даёт одинаковые записи (даты — от now())."""
+        def records():
+            return [
+                {
+                    key: value for key, value in record.items()
+                    if key not in ('pub_date', 'created')
+                }
+                for record in generate_records(POSTS, USERS, GROUPS, seed=1)
+            ]
+        self.assertEqual(records(), records())
+
+    def test_authors_follow_power_law(self):
+        """Самый активный автор пишет заметно больше среднего."""
+        authors = Counter(
+            record['author']
+            for record in generate_records(POSTS, USERS, GROUPS)
+            if record['model'] == 'post'
+        )
+        self.assertGreater(authors.most_common(1)[0][1], 3 * POSTS / USERS)
+
+    def test_seed(self):
+        """seed создаёт все объекты, счётчики и ленты подписок."""
+        seed(POSTS, USERS, GROUPS, batch_size=50)
+        self.assertEqual(Post.objects.count(), POSTS)
+        self.assertEqual(User.objects.count(), USERS)
+        self.assertEqual(Group.objects.count(), GROUPS)
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        self.assertEqual(
+            Comment.objects.count(),
+            sum(Post.objects.values_list('comments_count', flat=True)),
+        )
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(
+                author__following__user=follow.user
+            ).count(),
+        )
+
+    def test_seed_command(self):
+        """Команда seed сообщает, сколько создано объектов."""
+        stdout = StringIO()
+        call_command(
+            'seed', posts=POSTS, users=USERS, groups=GROUPS, stdout=stdout
+        )
+        self.assertIn(str(POSTS), stdout.getvalue())
+        self.assertEqual(Post.objects.count(), POSTS)
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed(POSTS, USERS, GROUPS)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_percentile(self):
+        """Перцентиль считается методом ближайшего ранга."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertIsNone(percentile([], 50))
+
+    def test_run_benchmark(self):
+        """Замер проходит по всем view без ошибок."""
+        result = run_benchmark(requests=5)
+        self.assertEqual(result['dataset']['posts'], POSTS)
+        self.assertEqual(set(result['views']), set(VIEWS))
+        for view, stats in result['views'].items():
+            with self.subTest(view=view):
+                self.assertEqual(stats['requests'], 5)
+                self.assertEqual(stats['errors'], 0)
+                for percent in PERCENTILES:
+                    self.assertIsNotNone(stats['p%d_ms' % percent])
+
+    def test_benchmark_command_compare(self):
+        """Команда сохраняет замеры и сравнивает с прошлым запуском."""
+        path = os.path.join(self.directory, 'benchmark.json')
+        call_command(
+            'benchmark', requests=3, views='index,post_detail',
+            output=path, stdout=StringIO(),
+        )
+        with open(path, encoding='utf-8') as stream:
+            runs = json.load(stream)
+        self.assertEqual(set(runs[0]['views']), {'index', 'post_detail'})
+        stdout = StringIO()
+        call_command(
+            'benchmark', requests=3, views='index', compare=path,
+            no_cache=True, stdout=stdout,
+        )
+        self.assertIn('%)', stdout.getvalue())
@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core import metrics, timing
+from core.thumbnails import lock_key
+from posts import thumbnails
+from posts.models import Post, User
+from posts.tests.constants import POST_TEXT, USER_USERNAME
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USER_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        default.kvstore.lru.clear()
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True
+        )
+        self.post = Post.objects.create(
+            author=self.author,
+            text=POST_TEXT,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def thumbnail_files(self):
+        return [
+            name
+            for _, _, names in os.walk(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+            for name in names
+        ]
+
+    def test_generate_creates_thumbnail(self):
+        """generate создаёт миниатюру изображения поста."""
+        self.assertTrue(thumbnails.generate(self.post.image.name))
+        self.assertEqual(len(self.thumbnail_files()), 1)
+
+    def test_generate_skips_locked_image(self):
+        """Изображение, которое уже обрабатывается, пропускается."""
+        cache.add('thumbnail-lock:%s' % self.post.image.name, 1)
+        self.assertFalse(thumbnails.generate(self.post.image.name))
+        self.assertEqual(self.thumbnail_files(), [])
+
+    def test_pregenerate_command(self):
+        """Команда создаёт миниатюры для существующих постов."""
+        call_command(
+            'pregenerate_thumbnails', workers=1, stdout=StringIO()
+        )
+        self.assertEqual(len(self.thumbnail_files()), 1)
+
+    def test_pregenerate_command_counts_failures(self):
+        """Битое изображение логируется и не прерывает обход."""
+        broken = default_storage.save(
+            'posts/broken.gif', ContentFile(SMALL_GIF[:-4])
+        )
+        Post.objects.filter(pk=self.post.pk).update(image=broken)
+        Post.objects.create(
+            author=self.author,
+            text=POST_TEXT,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        out = StringIO()
+        with self.assertLogs(
+            'posts.management.commands.pregenerate_thumbnails'
+        ):
+            call_command('pregenerate_thumbnails', workers=1, stdout=out)
+        self.assertIn('Обработано изображений: 1', out.getvalue())
+        self.assertIn('Не удалось обработать изображений: 1', out.getvalue())
+        self.assertEqual(len(self.thumbnail_files()), 1)
+
+    @override_settings(THUMBNAIL_LOCK_WAIT=5)
+    def test_request_waits_for_thumbnail_in_progress(self):
+        """Запрос не создаёт миниатюру, которую создаёт другой процесс."""
+        name = self.post.image.name
+        thumbnail = get_thumbnail(name, '960x339', crop='center')
+        delete(name, delete_file=False)
+        default.kvstore.lru.clear()
+        default_storage.delete(thumbnail.name)
+        cache.add(lock_key(thumbnail.name), 1)
+
+        def finish_elsewhere():
+            default_storage.save(thumbnail.name, ContentFile(SMALL_GIF))
+            cache.delete(lock_key(thumbnail.name))
+
+        timer = threading.Timer(0.2, finish_elsewhere)
+        timer.start()
+        get_thumbnail(name, '960x339', crop='center')
+        timer.join()
+        with default_storage.open(thumbnail.name) as result:
+            self.assertEqual(result.read(), SMALL_GIF)
+
+    def test_repeated_lookup_served_from_lru(self):
+        """Повторный поиск миниатюры не обращается к общему кэшу и БД."""
+        thumbnails.generate(self.post.image.name)
+        with timing.request_timer() as timer:
+            thumbnails.generate(self.post.image.name)
+        self.assertEqual(
+            timer.counts['thumbnail_store_hit']
+            + timer.counts['thumbnail_store_miss'], 0
+        )
+        self.assertGreater(timer.counts['thumbnail_lru_hit'], 0)
+        self.assertIn('LRU hits', timer.header())
+        self.assertIn(
+            'yatube_thumbnail_kv_lookups_total{tier="lru",result="hit"}',
+            metrics.render(),
+        )
+
+    def test_replaced_image_invalidates_thumbnails(self):
+        """Замена изображения удаляет записи о старых миниатюрах."""
+        old_name = self.post.image.name
+        thumbnails.generate(old_name)
+        self.assertIsNotNone(default.kvstore.get(ImageFile(old_name)))
+        self.post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF, 'image/gif'
+        )
+        self.post.save()
+        self.assertIsNone(default.kvstore.get(ImageFile(old_name)))
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.tests.constants import (
+    AUTHOR_USERNAME,
+    POST_FOLLOW_URL_NAME,
+    POST_TEXT,
+    USER_USERNAME,
+)
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=AUTHOR_USERNAME)
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.post = Post.objects.create(author=cls.author, text=POST_TEXT)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def get_feed(self, **params):
+        response = self.authorized_client.get(
+            reverse(POST_FOLLOW_URL_NAME), params
+        )
+        return response.context['page_obj']
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.post).exists())
+        self.assertEqual(list(self.get_feed()), [self.post])
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertEqual(list(self.get_feed()), [new_post, self.post])
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка удаляет посты автора из ленты."""
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+        self.assertEqual(list(self.get_feed()), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_read_from_posts(self):
+        """Посты популярных авторов подмешиваются в ленту при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists()
+        )
+        self.assertEqual(list(self.get_feed()), [new_post, self.post])
+
+    def test_feed_pages_by_cursor(self):
+        """Лента подписок разбивается на страницы курсором."""
+        Follow.objects.create(user=self.user, author=self.author)
+        for _ in range(10):
+            Post.objects.create(author=self.author, text=POST_TEXT)
+        first_page = self.get_feed()
+        second_page = self.get_feed(cursor=first_page.next_cursor)
+        self.assertEqual(len(first_page), 10)
+        self.assertEqual(list(second_page), [self.post])
+        self.assertFalse(second_page.has_next())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_heavy_author_stays_read_after_unfollow(self):
+        """Посты, написанные без fan-out, не пропадают после отписок."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.user, author=self.author)
+        follow = Follow.objects.create(user=reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text=POST_TEXT)
+        follow.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists()
+        )
+        self.assertEqual(list(self.get_feed()), [new_post, self.post])
+
+    @override_settings(TIMELINE_BACKFILL_POSTS=2)
+    def test_backfill_limited_to_latest_posts(self):
+        """Подписка добавляет в ленту только последние посты автора."""
+        posts = [
+            Post.objects.create(author=self.author, text=POST_TEXT)
+            for _ in range(3)
+        ]
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.user).values_list('post_id', flat=True)),
+            {posts[-1].pk, posts[-2].pk},
+        )
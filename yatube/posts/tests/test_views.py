@@ -2,11 +2,14 @@ from http import HTTPStatus
 
 from django import forms
 from django.core.cache import cache
+from django.core.paginator import EmptyPage
+from django.db import connection
 from django.test import Client, TestCase
 from django.urls import reverse
 
 from posts.forms import PostForm
 from posts.models import Comment, Follow, Group, Post, User
+from posts.paginator import FORWARD, CursorPaginator
 from posts.tests.constants import (
     COMMENT_TEXT,
     GROUP_DESCRIPTION,
@@ -27,6 +30,7 @@ from posts.tests.constants import (
     PROFILE_URL_NAME,
     POST_EDIT_TEMPLATE,
     POST_EDIT_URL_NAME,
+    POST_EDIT_TEXT,
     POST_TEXT,
     USER_USERNAME,
 )
@@ -201,15 +205,23 @@ class PostViewTests(TestCase):
         """Проверка работы кэша для index."""
         response = self.guest_client.get(reverse(INDEX_URL_NAME))
         response_1 = response.content
-        Post.objects.get(id=1).delete()
+        Post.objects.filter(id=self.post.id).update(text=POST_EDIT_TEXT)
         response2 = self.guest_client.get(reverse(INDEX_URL_NAME))
         response_2 = response2.content
         self.assertEqual(response_1, response_2)
 
+    def test_cache_index_invalidated_on_change(self):
+        """Изменение постов сразу сбрасывает кэш index."""
+        response_1 = self.guest_client.get(reverse(INDEX_URL_NAME)).content
+        Post.objects.create(author=self.author, text=POST_EDIT_TEXT)
+        response_2 = self.guest_client.get(reverse(INDEX_URL_NAME)).content
+        self.assertNotEqual(response_1, response_2)
+        self.assertIn(POST_EDIT_TEXT.encode(), response_2)
+
     def test_follow_page(self):
         """Проверка подписки и отписки на автора"""
         response = self.authorized_client.get(reverse(POST_FOLLOW_URL_NAME))
-        self.assertEqual(len(response.context['posts']), 0)
+        self.assertEqual(len(response.context['page_obj']), 0)
         count_follow = Follow.objects.count()
         Follow.objects.get_or_create(user=self.user, author=self.post.author)
         self.assertEqual(Follow.objects.count(), count_follow + 1)
@@ -224,7 +236,7 @@ class PostViewTests(TestCase):
                 POST_FOLLOW_URL_NAME
             )
         )
-        self.assertNotIn(self.post, not_follower.context['posts'])
+        self.assertNotIn(self.post, not_follower.context['page_obj'])
         Follow.objects.all().delete()
         self.assertEqual(count_follow, 0)
         self.assertFalse(Follow.objects.filter(
@@ -247,28 +259,93 @@ class PaginatorViewsTest(TestCase):
                                   group=self.group,
                                   author=self.author))
         Post.objects.bulk_create(bulk_post)
+        cache.clear()
 
     def test_correct_number_of_pages_contains(self):
         """Корректное количество постов на первых двух страницах шаблонов."""
         NUMBER_OF_POSTS_1ST_PAGE = 10
         NUMBER_OF_POSTS_2ND_PAGE = 3
-        pages = (
-            (1, NUMBER_OF_POSTS_1ST_PAGE),
-            (2, NUMBER_OF_POSTS_2ND_PAGE)
-        )
         pages_url = (
             (INDEX_URL_NAME, INDEX_TEMPLATE, None),
             (GROUP_LIST_URL_NAME, GROUP_LIST_TEMPLATE, (self.group.slug,)),
             (PROFILE_URL_NAME, PROFILE_TEMPLATE, (self.author,)),
         )
         for url, _, args in pages_url:
-            for page_num, posts_count in pages:
-                with self.subTest(url=url, page_num=page_num):
-                    response = self.guest_client.get(
-                        reverse(url, args=args),
-                        {'page': page_num}
-                    )
-                    self.assertEqual(
-                        len(response.context.get('page_obj').object_list),
-                        posts_count
-                    )
+            with self.subTest(url=url):
+                first_page = self.guest_client.get(
+                    reverse(url, args=args)
+                ).context.get('page_obj')
+                self.assertEqual(
+                    len(first_page.object_list), NUMBER_OF_POSTS_1ST_PAGE
+                )
+                self.assertFalse(first_page.has_previous())
+                second_page = self.guest_client.get(
+                    reverse(url, args=args),
+                    {'cursor': first_page.next_cursor}
+                ).context.get('page_obj')
+                self.assertEqual(
+                    len(second_page.object_list), NUMBER_OF_POSTS_2ND_PAGE
+                )
+                self.assertFalse(second_page.has_next())
+
+    def test_pages_do_not_overlap(self):
+        """Курсоры ведут вперёд и назад без пропусков и повторов."""
+        url = reverse(INDEX_URL_NAME)
+        first_page = self.guest_client.get(url).context['page_obj']
+        cache.clear()
+        second_page = self.guest_client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            list(first_page) + list(second_page),
+            list(Post.objects.order_by('-pub_date', '-id'))
+        )
+        cache.clear()
+        back_page = self.guest_client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_page_members_do_not_count(self):
+        """Номера страниц — курсоры, COUNT(*) не выполняется."""
+        first_page = self.guest_client.get(
+            reverse(INDEX_URL_NAME)
+        ).context['page_obj']
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                first_page.next_page_number(), first_page.next_cursor
+            )
+            self.assertIsNone(first_page.paginator.count)
+            self.assertIsNone(first_page.paginator.num_pages)
+            self.assertEqual(list(first_page.paginator.page_range), [])
+            self.assertIsNone(first_page.start_index())
+            self.assertTrue(first_page.has_other_pages())
+        with self.assertRaises(EmptyPage):
+            first_page.previous_page_number()
+
+    def test_next_page_seeks_index(self):
+        """Страница по курсору ищет по индексу, а не читает его с начала."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN is SQLite')
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        values = paginator.load_values(
+            paginator.dump_values(Post.objects.order_by('-pub_date').first())
+        )
+        sql, params = paginator.keyset(
+            Post.objects.all(), FORWARD, values
+        )[:10].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertIn(
+            'SEARCH posts_post USING INDEX post_feed_idx (pub_date<?)', plan
+        )
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
+        response = self.guest_client.get(
+            reverse(PROFILE_URL_NAME, args=(self.author,)),
+            {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertFalse(response.context['page_obj'].has_previous())
@@ -0,0 +1,80 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from sorl.thumbnail import get_thumbnail
+
+from core.thumbnails import LOCK_TIMEOUT, lock_key
+
+logger = logging.getLogger(__name__)
+
+# Должны совпадать с тегом {% thumbnail %} в шаблонах постов.
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = None
+
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+            _slots = threading.BoundedSemaphore(
+                settings.THUMBNAIL_QUEUE_SIZE
+            )
+    return _executor
+
+
+def generate(name):
+    """Создаёт миниатюры изображения поста, если их ещё нет.
+
+    Блокировка изображения в общем кэше не даёт нескольким фоновым
+    задачам обрабатывать его одновременно; с запросами страниц каждую
+    миниатюру разделяет блокировка core.thumbnails.ThumbnailBackend.
+    """
+    key = lock_key(name)
+    if not cache.add(key, 1, LOCK_TIMEOUT):
+        return False
+    try:
+        for geometry, options in POST_THUMBNAILS:
+            get_thumbnail(name, geometry, **options)
+    finally:
+        cache.delete(key)
+    return True
+
+
+def _run(name):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s', name)
+    finally:
+        _slots.release()
+        for connection in connections.all():
+            connection.close()
+
+
+def schedule(name):
+    """Ставит генерацию миниатюр в фоновый пул.
+
+    Если очередь заполнена, задача отбрасывается: миниатюра будет
+    создана при первом показе, как и без предварительной генерации.
+    """
+    if not name:
+        return False
+    executor = _get_executor()
+    if not _slots.acquire(blocking=False):
+        logger.warning('Thumbnail queue is full, skipping %s', name)
+        return False
+    executor.submit(_run, name)
+    return True
@@ -0,0 +1,183 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginator import BACKWARD, CursorPaginator
+
+BATCH_SIZE = 500
+
+TimelineRow = namedtuple('TimelineRow', ('pub_date', 'id'))
+
+
+def mark_heavy_authors(author_id=None):
+    """Отмечает авторов, перешедших TIMELINE_FANOUT_LIMIT подписчиков.
+
+    Отметка не снимается, когда подписчиков становится меньше: посты,
+    написанные в это время, не разложены по лентам и должны и дальше
+    подмешиваться при чтении.
+    """
+    stats = UserStats.objects.filter(
+        fanout_on_read=False,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    )
+    if author_id is not None:
+        stats = stats.filter(user_id=author_id)
+    return stats.update(fanout_on_read=True)
+
+
+def is_heavy_author(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id, fanout_on_read=True
+    ).exists()
+
+
+def heavy_authors_followed_by(user):
+    """Авторы, на которых подписан user и чьи посты не раскладываются.
+
+    Признак берётся из денормализованной отметки UserStats, а не
+    считается через GROUP BY по всем подпискам этих авторов.
+    """
+    return list(
+        Follow.objects.filter(
+            user=user, author__stats__fanout_on_read=True
+        ).values_list('author_id', flat=True)
+    )
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора.
+
+    Посты отмеченных mark_heavy_authors авторов не раскладываются:
+    их подмешивает TimelinePaginator при чтении.
+    """
+    if is_heavy_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator():
+        batch.append(TimelineEntry(
+            user_id=user_id,
+            post_id=post.id,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    _bulk_insert(batch)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора.
+
+    Берётся не больше TIMELINE_BACKFILL_POSTS постов; посты «тяжёлых»
+    авторов и так читаются при чтении ленты.
+    """
+    if is_heavy_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL_POSTS]
+    batch = []
+    for post_id, pub_date in posts.iterator():
+        batch.append(TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            _bulk_insert(batch)
+            batch = []
+    _bulk_insert(batch)
+
+
+def fill(follows, since_post=None):
+    """Раскладывает посты по лентам для подписок из queryset follows.
+
+    Нужна после массового импорта, когда сигналы не вызываются. Если
+    передан since_post, берутся только посты с id больше него. Строки
+    вставляются одним INSERT ... SELECT, без выборки в Python.
+    """
+    heavy_authors = UserStats.objects.filter(
+        fanout_on_read=True
+    ).values('user_id')
+    follows = follows.exclude(author__in=heavy_authors)
+    if since_post is None:
+        follows = follows.filter(author__posts__isnull=False)
+    else:
+        follows = follows.filter(author__posts__id__gt=since_post)
+    select, params = follows.values_list(
+        'user_id', 'author_id', 'author__posts__id', 'author__posts__pub_date'
+    ).query.sql_with_params()
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '%s %s (user_id, author_id, post_id, pub_date) %s %s' % (
+                ops.insert_statement(ignore_conflicts=True),
+                ops.quote_name(TimelineEntry._meta.db_table),
+                select,
+                ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+            ),
+            params,
+        )
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+class TimelinePaginator(CursorPaginator):
+    """Пагинатор ленты подписок.
+
+    Читает пары (pub_date, post_id) из TimelineEntry по индексу и
+    сливает их с постами «тяжёлых» авторов (fan-out-on-read), затем
+    одним запросом загружает посты страницы.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(
+            Post.objects.select_related('author', 'group'), per_page
+        )
+        self.user = user
+
+    def fetch(self, direction, values, limit):
+        entries = self.keyset(
+            TimelineEntry.objects.filter(user=self.user),
+            direction, values, fields=('pub_date', 'post_id'),
+        ).values_list('pub_date', 'post_id')
+        rows = {
+            post_id: TimelineRow(pub_date, post_id)
+            for pub_date, post_id in entries[:limit]
+        }
+        heavy_authors = heavy_authors_followed_by(self.user)
+        if heavy_authors:
+            posts = self.keyset(
+                Post.objects.filter(author__in=heavy_authors),
+                direction, values,
+            ).values_list('pub_date', 'id')
+            rows.update(
+                (post_id, TimelineRow(pub_date, post_id))
+                for pub_date, post_id in posts[:limit]
+            )
+        return sorted(
+            rows.values(),
+            key=lambda row: (row.pub_date, row.id),
+            reverse=direction != BACKWARD,
+        )[:limit]
+
+    def resolve(self, rows):
+        posts = self.object_list.in_bulk([row.id for row in rows])
+        return [posts[row.id] for row in rows if row.id in posts]
@@ -1,70 +1,153 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import redirect, render, get_object_or_404
-from django.views.decorators.cache import cache_page
-
+from django.views.decorators.http import etag
+
+from .cache import generation_cache_page
+from . import thumbnails
+from .conditional import (
+    get_author, get_group, get_post, group_etag, post_detail_etag,
+    profile_etag,
+)
+from .export import FIELDS, FORMATS, export_lines
 from .models import Comment, Follow, Group, Post
 from .forms import CommentForm, PostForm
+from .paginator import CursorPaginator
+from .search import SearchPaginator, fallback_queryset, fts_available
+from .timeline import TimelinePaginator
 
 User = get_user_model()
 
 QUANTITY = 10
+COMMENTS_QUANTITY = 20
 LEN_LETTERS = 30
 
 
+def schedule_thumbnails(post):
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: thumbnails.schedule(name))
+
+
 def get_page_context(queryset, request):
-    paginator = Paginator(queryset, QUANTITY)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(queryset, QUANTITY)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     return {
         'page_obj': page_obj,
     }
 
 
-@cache_page(20)
+@generation_cache_page('index', settings.INDEX_CACHE_TIMEOUT)
 def index(request):
-    context = get_page_context(Post.objects.all(), request)
+    context = get_page_context(
+        Post.objects.select_related('author', 'group'), request
+    )
     return render(request, 'posts/index.html', context)
 
 
+@etag(group_etag)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_group(request, slug)
     context = {
         'group': group,
-        'posts': posts,
     }
-    context.update(get_page_context(group.posts.all(), request))
+    context.update(
+        get_page_context(group.posts.select_related('author'), request)
+    )
     return render(request, 'posts/group_list.html', context)
 
 
+@etag(profile_etag)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following = (
-        request.user.is_authenticated
-        and author.following.filter(user=request.user).exists()
-    )
+    author = get_author(request, username)
     context = {
         'author': author,
-        'following': following,
+        'following': getattr(author, 'is_followed', False),
     }
-    context.update(get_page_context(author.posts.all(), request))
+    context.update(
+        get_page_context(author.posts.select_related('group'), request)
+    )
     return render(request, 'posts/profile.html', context)
 
 
+def export_response(request, name, **scope):
+    data = request.GET.get('data', 'posts')
+    data_format = request.GET.get('format', 'ndjson')
+    if data not in FIELDS or data_format not in FORMATS:
+        raise Http404
+    response = StreamingHttpResponse(
+        export_lines(data, data_format, **scope),
+        content_type=FORMATS[data_format],
+    )
+    response['Content-Disposition'] = (
+        'attachment; filename="%s-%s.%s"' % (name, data, data_format)
+    )
+    return response
+
+
+@login_required
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return export_response(request, group.slug, group=group)
+
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    return export_response(request, author.username, author=author)
+
+
+@etag(post_detail_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post.objects.select_related('author'), id=post_id)
+    post = get_post(request, post_id)
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
     context = {
         'post': post,
         'form': form,
-        'comments': comments,
+        'comments': get_comments_page(post.id, request.GET.get('comments')),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments_page(post_id, cursor):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COMMENTS_QUANTITY,
+        ordering=('-created', 'id'),
+    )
+    return paginator.get_page(cursor)
+
+
+def post_comments(request, post_id):
+    """Следующая порция комментариев для подгрузки на post_detail."""
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(post.id, request.GET.get('cursor')),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+    }
+    if query:
+        cursor = request.GET.get('cursor')
+        if fts_available():
+            page_obj = SearchPaginator(query, QUANTITY).get_page(cursor)
+        else:
+            page_obj = CursorPaginator(
+                fallback_queryset(query), QUANTITY
+            ).get_page(cursor)
+        context['page_obj'] = page_obj
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -75,7 +158,9 @@ def post_create(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        with transaction.atomic():
+            post.save()
+            schedule_thumbnails(post)
         return redirect('posts:profile', username=request.user)
     return render(request, 'posts/create_post.html', context)
 
@@ -96,8 +181,11 @@ def post_edit(request, post_id):
         return redirect('posts:profile', username=request.user)
     if not form.is_valid():
         return render(request, 'posts/create_post.html', context)
-    post = form.save()
-    post.save()
+    post = form.save(commit=False)
+    with transaction.atomic():
+        post.save(update_fields=PostForm.Meta.fields)
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
     return redirect('posts:post_detail', post_id)
 
 
@@ -109,15 +197,16 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user).all()
+    paginator = TimelinePaginator(request.user, QUANTITY)
     context = {
-        'posts': posts,
+        'page_obj': paginator.get_page(request.GET.get('cursor')),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -127,12 +216,10 @@ def profile_follow(request, username):
     if request.user.username == username:
         return redirect('posts:profile', username=username)
     following = get_object_or_404(User, username=username)
-    is_followed = Follow.objects.filter(
-        user=request.user,
-        author=following
-    ).exists()
-    if not is_followed:
-        Follow.objects.create(user=request.user, author=following)
+    with transaction.atomic():
+        # Уникальный индекс (user, author) защищает от гонки двойных
+        # нажатий: get_or_create перехватывает IntegrityError.
+        Follow.objects.get_or_create(user=request.user, author=following)
     return redirect('posts:profile', username=username)
 
 
@@ -140,5 +227,6 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     follower = get_object_or_404(Follow, author=author, user=request.user)
-    follower.delete()
+    with transaction.atomic():
+        follower.delete()
     return redirect('posts:profile', username=username)
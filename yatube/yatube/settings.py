@@ -18,11 +18,33 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_BYTES': 64 * 1024 * 1024,
+        },
     }
 }
 
 
+# Кэш index сбрасывается сменой поколения при изменении постов, групп
+# и авторов, поэтому время жизни может быть большим.
+INDEX_CACHE_TIMEOUT = 60 * 60 * 6
+
+
+# Фоновая генерация миниатюр после сохранения поста.
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_QUEUE_SIZE = 100
+
+# Метаданные миниатюр sorl-thumbnail: LRU в процессе, затем общий кэш и БД.
+THUMBNAIL_KVSTORE = 'core.thumbnails.KVStore'
+THUMBNAIL_BACKEND = 'core.thumbnails.ThumbnailBackend'
+THUMBNAIL_LRU_SIZE = 10000
+THUMBNAIL_LRU_TIMEOUT = 300
+# Сколько секунд запрос ждёт миниатюру, которую создаёт другой процесс.
+THUMBNAIL_LOCK_WAIT = 10
+
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # Quick-start development settings - unsuitable for production
@@ -32,6 +54,15 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 
+# Авторы с большим числом подписчиков не раскладываются по лентам
+# при публикации, их посты подмешиваются в follow_index при чтении.
+# Отметка остаётся и после отписок, иначе посты, не разложенные по
+# лентам, пропали бы из них. Новая подписка на обычного автора
+# добавляет в ленту TIMELINE_BACKFILL_POSTS его последних постов.
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL_POSTS = 100
+
+
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
@@ -64,10 +95,16 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.metrics.MetricsMiddleware',
+    'core.middleware.server_timing.ServerTimingMiddleware',
+    'core.middleware.profiling.ProfilingMiddleware',
+    'core.middleware.query_budget.QueryBudgetMiddleware',
+    'core.middleware.replica.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,9 +114,103 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Метрики Prometheus на /metrics. Каждый процесс пишет счётчики в свой
+# файл в METRICS_DIR, /metrics складывает файлы всех процессов. Каталог
+# нужно очищать при перезапуске сервиса, иначе файлы старых процессов
+# копятся (их значения при этом учитываются верно).
+# /metrics отвечает запросу с заголовком Authorization: Bearer
+# METRICS_TOKEN (пустой токен отключает проверку) или с адреса из
+# METRICS_ALLOWED_IPS. За прокси REMOTE_ADDR — адрес самого прокси,
+# поэтому адреса указывают, только если сервис слушает отдельный порт
+# без прокси; по умолчанию /metrics закрыт.
+METRICS_ENABLED = True
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_TOKEN = ''
+METRICS_ALLOWED_IPS = ()
+
+# Заголовок Server-Timing (БД, шаблоны, кэш, миниатюры) у ответов view
+# этих приложений. В журнал gunicorn попадает через %({server-timing}o)s.
+SERVER_TIMING_ENABLED = True
+SERVER_TIMING_APPS = ('posts', 'users', 'about')
+
+# Профилирование запросов cProfile. PROFILING_SAMPLE_RATE — доля
+# профилируемых запросов; запрос с токеном со страницы admin/profiles/
+# в заголовке PROFILING_HEADER профилируется всегда. Для flame graph
+# стек запроса снимается раз в PROFILING_STACK_INTERVAL секунд.
+PROFILING_ENABLED = True
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_STACK_INTERVAL = 0.001
+PROFILING_HEADER = 'X-Profile'
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_MAX_SAMPLES = 50
+
+# Журнал медленных запросов к БД: запросы дольше SLOW_QUERY_THRESHOLD
+# секунд (None — не писать) пишутся строкой JSON с отпечатком SQL,
+# параметрами без строковых значений, именем URL и строкой кода или
+# шаблона, откуда пришёл запрос. Сводка — manage.py slowqueries.
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.slow_queries.JSONFormatter'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'core.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Бюджет запросов к БД на один запрос к view. Превышение логируется
+# в DEBUG и роняет тесты, использующие core.testing.QueryBudgetMixin.
+QUERY_BUDGET_ENABLED = True
+QUERY_REPEAT_LIMIT = 2
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    'posts:group_list': 4,
+    'posts:profile': 5,
+    'posts:post_detail': 4,
+    'posts:follow_index': 6,
+    'posts:search': 5,
+    'api:post_list': 3,
+    'api:group_list': 3,
+    'api:group_posts': 4,
+    'api:profile_posts': 4,
+    'api:post_detail': 4,
+    'api:follow_feed': 5,
+}
+
+# Тесты пишут загрузки, метрики и кэш во временный каталог.
+TEST_RUNNER = 'core.testing.TestRunner'
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
+# Загрузки больше FILE_UPLOAD_MAX_MEMORY_SIZE пишутся во временный файл,
+# а не держатся в памяти. Изображения постов нормализуются при загрузке.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_MAX_BYTES = 1024 * 1024
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -87,7 +218,7 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -112,9 +243,40 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Копия default для чтения лент, обновляется manage.py replicate
+    # подменой файла, поэтому соединения с ней не должны переживать
+    # запрос (CONN_MAX_AGE = 0). В тестах указывает на default.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['core.replica.ReplicaRouter']
+
+# View из REPLICA_VIEWS читают модели приложений REPLICA_APPS с реплики,
+# остальные запросы и любая запись идут в default. Записавший клиент
+# REPLICA_PIN_SECONDS секунд читает из default (cookie REPLICA_PIN_COOKIE),
+# поэтому интервал manage.py replicate должен быть меньше. Пока файла
+# реплики нет или поколение REPLICA_GENERATION изменилось после
+# последнего копирования, всё читается из default: кэш страниц,
+# фрагментов и ETag не заполняется старыми строками реплики.
+REPLICA_ENABLED = True
+REPLICA_DATABASE = 'replica'
+REPLICA_APPS = ('posts',)
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+)
+REPLICA_PIN_COOKIE = 'primary_pin'
+REPLICA_PIN_SECONDS = 10
+REPLICA_GENERATION = 'posts.cache.index_generation'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
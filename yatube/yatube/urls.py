@@ -3,13 +3,21 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import metrics_view, profiles
+
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
+    path(
+        'admin/profiles/',
+        admin.site.admin_view(profiles),
+        name='admin_profiles'),
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 handler404 = 'core.views.page_not_found'